@@ -1,6 +1,7 @@
 from .config_loader import load_config
 from .logger import setup_logger
+from .torch_backends import configure_torch_backends
 
 
 
-__all__ = ['load_config', 'setup_logger']
\ No newline at end of file
+__all__ = ['load_config', 'setup_logger', 'configure_torch_backends']
\ No newline at end of file
@@ -0,0 +1,60 @@
+import bisect
+import threading
+
+# Bucket upper bounds in seconds; the last bucket catches everything slower
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LatencyHistogram:
+    """Thread-safe fixed-bucket latency histogram."""
+    def __init__(self, name: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def quantile(self, q: float):
+        """Upper bound of the bucket holding the q-quantile."""
+        with self._lock:
+            if self.count == 0:
+                return 0.0
+            target = q * self.count
+            running = 0
+            for bound, n in zip(self.buckets, self.counts):
+                running += n
+                if running >= target:
+                    return bound
+            return self.max
+
+    def summary(self):
+        mean = self.total / self.count if self.count else 0.0
+        return (f"n={self.count} mean={mean * 1000:.0f}ms p50<={self.quantile(0.5) * 1000:.0f}ms "
+                f"p95<={self.quantile(0.95) * 1000:.0f}ms p99<={self.quantile(0.99) * 1000:.0f}ms "
+                f"max={self.max * 1000:.0f}ms")
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def get_histogram(name: str):
+    """Process-wide histogram registry so producers, TaskManager and outputs share instances."""
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = LatencyHistogram(name)
+        return _registry[name]
+
+
+def all_histograms():
+    with _registry_lock:
+        return list(_registry.values())
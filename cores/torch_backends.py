@@ -0,0 +1,19 @@
+import logging
+
+
+def configure_torch_backends(config: dict):
+    """
+    Process-wide torch backend switches (startup.mkldnn / startup.nnpack). Applied once,
+    before any model loads, so every task and its startup benchmarks see the same setting.
+    """
+    import torch
+
+    startup_cfg = config.get('startup', {})
+    mkldnn = bool(startup_cfg.get('mkldnn', False))
+    nnpack = bool(startup_cfg.get('nnpack', False))
+    try:
+        torch.backends.mkldnn.enabled = mkldnn
+        torch.backends.nnpack.enabled = nnpack
+    except AttributeError:
+        pass
+    logging.getLogger("AIPipeline").debug(f"[TorchBackends] mkldnn={mkldnn} nnpack={nnpack}")
@@ -3,6 +3,13 @@ import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 import logging
 
+# BGR box colours, picked by class id
+_PALETTE = [
+    (56, 56, 255), (151, 157, 255), (31, 112, 255), (29, 178, 255), (49, 210, 207),
+    (10, 249, 72), (23, 204, 146), (134, 219, 61), (52, 147, 26), (187, 212, 0),
+    (168, 153, 44), (255, 194, 0), (147, 69, 52), (255, 115, 100), (236, 24, 0),
+]
+
 class Visualizer:
     
     def __init__(self, config: dict):
@@ -34,4 +41,30 @@ class Visualizer:
         b, g, r = color
         draw.text(position, text, font=font, fill=(r, g, b))
         
-        return cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
\ No newline at end of file
+        return cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
+
+    def draw_detections(self, img_bgr, detections, size=None, line_width=2):
+        """
+        Boxes with "label conf" tags straight from a Detections (replaces Results.plot()).
+        With size=(w, h) the image is resized first and the boxes scaled, so drawing
+        happens at output resolution instead of on the full camera frame.
+        """
+        if size is not None and (img_bgr.shape[1], img_bgr.shape[0]) != tuple(size):
+            canvas = cv2.resize(img_bgr, tuple(size))
+            scale = np.array([size[0] / img_bgr.shape[1], size[1] / img_bgr.shape[0]] * 2, dtype=np.float32)
+            boxes = (detections.xyxy * scale).astype(np.int32)
+        else:
+            canvas = img_bgr.copy()
+            boxes = detections.int_boxes()
+
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        for (x1, y1, x2, y2), class_id, conf in zip(boxes.tolist(), detections.cls.tolist(), detections.conf.tolist()):
+            color = _PALETTE[class_id % len(_PALETTE)]
+            cv2.rectangle(canvas, (x1, y1), (x2, y2), color, line_width)
+
+            text = f"{detections.names[class_id]} {conf:.2f}"
+            (tw, th), baseline = cv2.getTextSize(text, font, 0.5, 1)
+            ty = y1 - 4 if y1 - th - 6 >= 0 else y1 + th + 6
+            cv2.rectangle(canvas, (x1, ty - th - 4), (x1 + tw + 4, ty + baseline - 2), color, -1)
+            cv2.putText(canvas, text, (x1 + 2, ty - 2), font, 0.5, (255, 255, 255), 1, cv2.LINE_AA)
+        return canvas
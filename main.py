@@ -1,21 +1,26 @@
 import argparse
-import queue
+import threading
 import time
 import sys
 
+_STARTED = time.monotonic()
+
 from cores import load_config, setup_logger
-from stream.input_factory import InputFactory
-from stream.rtsp_out import RTSPOUTPUTProducer
-from tasks.task_manager import TaskManager
 
 def main():
     # ==========================================
     # 1. Parse Arguments (ตั้งค่าโหมดรับภาพ)
     # ==========================================
     parser = argparse.ArgumentParser(description="PTTEP Mission - AI Pipeline")
-    parser.add_argument('--mode', type=str, choices=['rtsp', 'http', 'video', 'image'], default='image', 
+    parser.add_argument('--mode', type=str, choices=['rtsp', 'http', 'video', 'image', 'mjpeg', 'offline'], default='image', 
                         help="Choose input mode")
+    parser.add_argument('--input', type=str, default=None,
+                        help="Offline mode: video file, image folder or folder of videos")
+    parser.add_argument('--output', type=str, default='results',
+                        help="Offline mode: directory for the per-frame JSONL results")
     args = parser.parse_args()
+    if args.mode == 'offline' and not args.input:
+        parser.error("--mode offline requires --input")
 
     # ==========================================
     # 2. โหลด Config & ตั้งค่า Logger
@@ -24,33 +29,67 @@ def main():
         config = load_config()
         logger = setup_logger(config)
         logger.info(f"=== Starting AI Pipeline in [{args.mode.upper()}] mode ===")
+        logger.info(f"[Startup] Config + logger ready at {time.monotonic() - _STARTED:.2f}s")
     except Exception as e:
         print(f"CRITICAL ERROR: Failed to initialize Core systems: {e}")
         sys.exit(1)
 
+    if args.mode == 'offline':
+        run_offline(args, config, logger)
+        return
+
+    # import โมดูลหนัก (GStreamer, torch ฯลฯ) หลัง parse args เท่านั้น เพื่อให้ --help และ error ตอบกลับทันที
+    # ส่วนโมเดล AI (ultralytics, doctr) จะถูก import ใน thread ที่โหลดโมเดลของ TaskManager
+    phase = time.monotonic()
+    from stream.input_factory import InputFactory
+    from stream.frame_ring import SharedFrameRing
+    from stream.latest_slot import LatestFrameSlot
+    from stream.rtsp_out import RTSPOUTPUTProducer
+    from tasks.task_manager import TaskManager
+    logger.info(f"[Startup] Pipeline modules imported in {time.monotonic() - phase:.2f}s")
+
     # ==========================================
     # 3. สร้างตะกร้า (Queues) สำหรับรับส่งภาพ
     # ==========================================
-    buffer_size = config['receive_img'].get('buffer_size', 1)
+    # รายชื่อกล้อง: จาก receive_img.sources หรือกล้องเดียว ('default') ตาม --mode
+    try:
+        sources = InputFactory.get_sources(mode=args.mode, config=config)
+    except Exception as e:
+        logger.error(f"Invalid input sources: {e}")
+        sys.exit(1)
+    
+    use_shared_memory = config['receive_img'].get('shared_memory', {}).get('enabled', False)
     
-    # ตะกร้ารับภาพขาเข้า
-    frame_queue = queue.Queue(maxsize=buffer_size)
+    # ตะกร้ารับภาพขาเข้า (กล้องละ 1 ใบ) ใช้ Condition ร่วมกันเพื่อให้ TaskManager รอทุกกล้องพร้อมกันได้
+    # ถ้าเปิด shared_memory จะใช้ ring buffer ใน shared memory แทน (รองรับการแยก process ในอนาคต)
+    input_condition = threading.Condition()
+    frame_queues = {}
+    for source in sources:
+        if use_shared_memory:
+            frame_queues[source['id']] = SharedFrameRing.from_config(config, source_id=source['id'])
+            logger.info(f"Using shared-memory frame ring '{frame_queues[source['id']].name}'")
+        else:
+            frame_queues[source['id']] = LatestFrameSlot(condition=input_condition)
     
-    # ตะกร้าส่งภาพขาออก (แยกเป็น Dictionary ตามแผนก เพื่อให้ RTSP ดึงไปสร้าง Stream แยกช่องได้)
+    # ตะกร้าส่งภาพขาออก (แยกตามกล้อง แล้วแยกเป็น Dictionary ตามแผนก เพื่อให้ RTSP ดึงไปสร้าง Stream แยกช่องได้)
     # หมายเหตุ: Key ตรงนี้ต้องตั้งชื่อให้ตรงกับตัวแปร mounts ใน config.yaml
+    # ทุกช่องใช้ LatestFrameSlot: ภาพใหม่ทับภาพเก่าเสมอ และไม่มี thread ไหนถูก block
     output_queues = {
-        'od': queue.Queue(maxsize=buffer_size),
-        'ocr': queue.Queue(maxsize=buffer_size),
-        'analog': queue.Queue(maxsize=buffer_size),
-        'classification': queue.Queue(maxsize=buffer_size)
+        source['id']: {
+            'od': LatestFrameSlot(),
+            'ocr': LatestFrameSlot(),
+            'analog': LatestFrameSlot(),
+            'classification': LatestFrameSlot()
+        }
+        for source in sources
     }
 
     # ==========================================
     # 4. สร้าง Components ต่างๆ (Producers & Consumer)
     # ==========================================
     try:
-        # ฝั่งรับภาพ (Camera/HTTP)
-        input_producer = InputFactory.create_producer(mode=args.mode, config=config, frame_queue=frame_queue)
+        # ฝั่งรับภาพ (Camera/HTTP) กล้องละ 1 Producer (หรือ HTTP ทุกกล้องรวมใน asyncio engine ตัวเดียว)
+        input_producers = InputFactory.create_producers(sources=sources, config=config, frame_queues=frame_queues)
     except Exception as e:
         logger.error(f"Failed to create Input Producer: {e}")
         sys.exit(1)
@@ -59,15 +98,19 @@ def main():
     output_producer = RTSPOUTPUTProducer(config=config, output_queues=output_queues)
 
     # ฝั่งสมอง AI (ดึงภาพเข้า -> คิด -> โยนลงตะกร้าขาออก)
-    ai_consumer = TaskManager(config=config, frame_queue=frame_queue, output_queues=output_queues)
+    # โมเดลโหลดคู่ขนานอยู่เบื้องหลัง ระหว่างนี้ stream od จะแสดงภาพ "WARMING UP" และเปิดแต่ละงานเมื่อโมเดลพร้อม
+    ai_consumer = TaskManager(config=config, frame_queues=frame_queues, output_queues=output_queues)
 
     # ==========================================
     # 5. สั่งให้ทุกส่วนเริ่มทำงานคู่ขนานกัน (Start Threads)
     # ==========================================
-    input_producer.start()
+    for input_producer in input_producers:
+        input_producer.start()
     output_producer.start()
     ai_consumer.start()
 
+    logger.info(f"[Startup] Ingest and output streams up at {time.monotonic() - _STARTED:.2f}s "
+                f"(models keep loading in the background)")
     logger.info("Pipeline is running. Press Ctrl+C to stop.")
 
     # ==========================================
@@ -81,16 +124,54 @@ def main():
         logger.info("KeyboardInterrupt detected. Shutting down pipeline gracefully...")
         
         # ส่งสัญญาณหยุดไปยัง Thread ต่างๆ
-        input_producer.stop()
+        for input_producer in input_producers:
+            input_producer.stop()
         output_producer.stop()
         ai_consumer.stop() 
         
         # รอให้ Thread เคลียร์ Memory และปิดตัวเองจนเสร็จสมบูรณ์
-        input_producer.join()
+        for input_producer in input_producers:
+            input_producer.join()
         output_producer.join()
         ai_consumer.join() 
         
+        for frame_queue in frame_queues.values():
+            if isinstance(frame_queue, SharedFrameRing):
+                frame_queue.close()
+                frame_queue.unlink()
+        
         logger.info("=== Pipeline shutdown complete. ===")
 
+def run_offline(args, config, logger):
+    """
+    โหมด Offline: อ่านไฟล์วิดีโอ/โฟลเดอร์รูปภาพโดยตรง (ไม่ผ่าน RTSP/HTTP และไม่มี output stream)
+    ถอดรหัสล่วงหน้าด้วย worker pool, ไม่ทิ้งเฟรมเลย และเขียนผลทุกเฟรมเป็น JSONL ลง --output
+    """
+    from stream.offline_reader import OfflineFrameReader
+    from tasks.result_writer import JSONLResultWriter
+    from tasks.task_manager import TaskManager
+
+    try:
+        reader = OfflineFrameReader(args.input, config)
+    except Exception as e:
+        logger.error(f"Failed to open offline input: {e}")
+        sys.exit(1)
+
+    writer = JSONLResultWriter(args.output, origins=reader.origins)
+    ai_consumer = TaskManager(config=config, frame_queues={}, output_queues={})
+
+    reader.start()
+    try:
+        # TaskManager ทำงานบน main thread จนกว่าจะหมดเฟรม (ไม่ต้อง start() เป็น thread แยก)
+        ai_consumer.run_offline(reader.frames, writer.write)
+    except KeyboardInterrupt:
+        logger.info("KeyboardInterrupt detected. Stopping offline run...")
+    finally:
+        reader.stop()
+        ai_consumer.stop()
+        reader.join()
+        writer.close()
+        logger.info("=== Offline run complete. ===")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
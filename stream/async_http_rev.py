@@ -0,0 +1,187 @@
+import asyncio
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import aiohttp
+except ImportError:  # optional dependency, only needed for receive_img.http.engine = "async"
+    aiohttp = None
+
+from stream.frame import Frame
+from stream.http_rev import extract_image_url
+from stream.http_poll import PollState
+from stream.ingest import IngestScaler
+
+
+class _PollSource:
+    """Per-URL polling state."""
+    __slots__ = ('source_id', 'url', 'frame_queue', 'poll', 'timeout', 'seq', 'failures')
+
+    def __init__(self, source_id, url, frame_queue, poll, timeout):
+        self.source_id = source_id
+        self.url = url
+        self.frame_queue = frame_queue
+        self.poll = poll
+        self.timeout = timeout
+        self.seq = 0
+        self.failures = 0
+
+    @property
+    def interval(self):
+        return self.poll.interval
+
+
+class AsyncHTTPIngestor(threading.Thread):
+    """
+    Polls many HTTP snapshot endpoints concurrently from a single asyncio event loop
+    with one pooled aiohttp session. Each source has its own interval, timeout and
+    exponential backoff; JPEG decoding is handed to a thread pool so the loop never stalls.
+    Frames are published to each source's hand-off slot like the other producers.
+    Same start()/stop()/join() lifecycle as BaseInputProducer.
+    """
+    def __init__(self, sources: list, config: dict):
+        super().__init__()
+        if aiohttp is None:
+            raise ImportError("aiohttp is required for the async HTTP ingestion engine (pip install aiohttp)")
+
+        http_cfg = config.get('receive_img', {}).get('http', {})
+        default_timeout = float(http_cfg.get('timeout', 3.0))
+        self.max_backoff = float(http_cfg.get('max_backoff', 30.0))
+        self.max_connections = int(http_cfg.get('max_connections', 64))
+        self.decode_workers = int(http_cfg.get('decode_workers', 4))
+        # Reduced-resolution JPEG decode (receive_img.ingest); stateless, so shared by all sources
+        self.ingest = IngestScaler.from_config(config)
+
+        self.sources = [
+            _PollSource(
+                source['id'], source['url'], source['frame_queue'],
+                PollState.from_config(source['url'], config, source.get('interval')),
+                float(source.get('timeout') or default_timeout),
+            )
+            for source in sources
+        ]
+
+        self.running = True
+        self.daemon = True
+        self.logger = logging.getLogger("AIPipeline")
+        self.loop = None
+        self._stop_event = None
+        self._decode_pool = None
+
+    def _decode(self, data: bytes):
+        """(image, encoded) with the JPEG kept only when OCR needs full-resolution crops."""
+        image, factor = self.ingest.decode_jpeg(data)
+        return image, (data if self.ingest.full_res_ocr and factor > 1 else None)
+
+    async def _fetch_bytes(self, session, source):
+        """
+        Bytes of a new image for one poll, or None when the source has not changed
+        (304 Not Modified or identical content). Follows the <img src> of an HTML
+        snapshot page and reuses the resolved URL until it expires or fails.
+        """
+        poll = source.poll
+        timeout = aiohttp.ClientTimeout(total=source.timeout)
+        url = poll.request_url()
+
+        async with session.get(url, headers=poll.conditional_headers(url), timeout=timeout) as response:
+            if response.status == 304:
+                poll.not_modified += 1
+                return None
+            response.raise_for_status()
+            if 'image' in response.headers.get('Content-Type', ''):
+                poll.remember_validators(url, response.headers)
+                data = await response.read()
+                return data if poll.is_new_content(data) else None
+            html = await response.text()
+
+        img_url = extract_image_url(html, url)
+        if img_url is None:
+            self.logger.warning(f"[AsyncHTTPIngestor] {source.source_id}: no image tag found in HTML.")
+            return None
+        poll.resolved(img_url)
+
+        async with session.get(img_url, headers=poll.conditional_headers(img_url), timeout=timeout) as response:
+            if response.status == 304:
+                poll.not_modified += 1
+                return None
+            response.raise_for_status()
+            poll.remember_validators(img_url, response.headers)
+            data = await response.read()
+            return data if poll.is_new_content(data) else None
+
+    async def _sleep(self, delay: float):
+        """Sleep that returns early when stop() is called."""
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), timeout=max(0.0, delay))
+        except asyncio.TimeoutError:
+            pass
+
+    async def _poll(self, session, source):
+        loop = asyncio.get_running_loop()
+
+        while self.running:
+            started = loop.time()
+            try:
+                data = await self._fetch_bytes(session, source)
+                if source.failures:
+                    self.logger.info(f"[AsyncHTTPIngestor] {source.source_id}: connection re-established.")
+                source.failures = 0
+
+                frame = None
+                if data:
+                    frame, encoded = await loop.run_in_executor(self._decode_pool, self._decode, data)
+                    if frame is not None:
+                        source.seq += 1
+                        source.frame_queue.publish(Frame(frame, source.source_id, source.seq, encoded=encoded))
+                    else:
+                        self.logger.error(f"[AsyncHTTPIngestor] {source.source_id}: failed to decode image.")
+
+                source.poll.on_poll(frame is not None)
+                delay = source.interval - (loop.time() - started)
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                source.poll.invalidate()
+                if source.failures == 0:
+                    self.logger.warning(f"[AsyncHTTPIngestor] {source.source_id}: connection lost ({e}). Backing off...")
+                source.failures += 1
+                delay = min(self.max_backoff, source.interval * (2 ** source.failures))
+
+            except Exception as e:
+                self.logger.error(f"[AsyncHTTPIngestor] {source.source_id}: unexpected error: {e}")
+                delay = source.interval
+
+            await self._sleep(delay)
+
+    async def _main(self):
+        self._stop_event = asyncio.Event()
+        if not self.running:
+            return
+
+        connector = aiohttp.TCPConnector(limit=self.max_connections)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            self.logger.info(f"[AsyncHTTPIngestor] Polling {len(self.sources)} HTTP source(s) "
+                             f"with up to {self.max_connections} connections.")
+            await asyncio.gather(*(self._poll(session, source) for source in self.sources))
+
+    def run(self):
+        self._decode_pool = ThreadPoolExecutor(max_workers=self.decode_workers, thread_name_prefix="jpeg-decode")
+        self.loop = asyncio.new_event_loop()
+        try:
+            self.loop.run_until_complete(self._main())
+        finally:
+            self.loop.close()
+            self._decode_pool.shutdown(wait=False)
+        for source in self.sources:
+            self.logger.info(f"[AsyncHTTPIngestor] {source.source_id}: new images: {source.poll.changes}, "
+                             f"not modified: {source.poll.not_modified}, duplicates: {source.poll.duplicates}")
+        self.logger.info("[AsyncHTTPIngestor] Thread stopped cleanly.")
+
+    def stop(self):
+        self.running = False
+        if self.loop is not None and self._stop_event is not None:
+            try:
+                self.loop.call_soon_threadsafe(self._stop_event.set)
+            except RuntimeError:
+                pass  # loop already closed
+        self.logger.debug("[AsyncHTTPIngestor] Stop signal received.")
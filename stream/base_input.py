@@ -1,16 +1,19 @@
 import threading
-import queue
 from abc import ABC, abstractmethod
 import logging
+from stream.frame import Frame
 
 class BaseInputProducer(threading.Thread, ABC):
     """
     Abstract Base Class (Template) for all types of Producers.
     Inherits from threading.Thread to run in the background.
     """
-    def __init__(self, source_url: str, frame_queue: queue.Queue):
+    def __init__(self, source_url: str, frame_queue, source_id: str = 'default'):
         super().__init__()
         self.source_url = source_url
+        self.source_id = source_id
+        self.seq = 0
+        # Frame hand-off (LatestFrameSlot or SharedFrameRing): publish() overwrites, never blocks
         self.frame_queue = frame_queue
         self.running = True
         self.daemon = True  # Allows the thread to terminate with the main program.
@@ -26,6 +29,15 @@ class BaseInputProducer(threading.Thread, ABC):
         """Forces child classes to implement an image retrieval function (runs in a Thread)."""
         pass
 
+    def _publish(self, image, capture_ts=None, encoded=None):
+        """Wrap a decoded image in a Frame envelope and hand it off (common to all)."""
+        self.seq += 1
+        try:
+            self.frame_queue.publish(Frame(image, self.source_id, self.seq, capture_ts, encoded))
+        except ValueError as e:
+            # A frame the hand-off cannot hold must not kill the producer thread; drop it
+            self.logger.error(f"[{self.__class__.__name__}] Dropped frame #{self.seq}: {e}")
+
     def stop(self):
         """Stop function (common to all, no need to reimplement)."""
         self.running = False
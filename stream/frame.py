@@ -0,0 +1,57 @@
+import time
+import cv2
+import numpy as np
+
+
+class Frame:
+    """
+    Compact envelope carried through the pipeline instead of a bare numpy array.
+    Timestamps come from time.monotonic() so ages are comparable across threads and processes.
+    `encoded` optionally keeps the source JPEG when `image` was decoded at reduced resolution,
+    so full-resolution crops can still be taken (full_res_crop).
+    """
+    __slots__ = ('image', 'source_id', 'seq', 'capture_ts', 'stamps', 'encoded', '_full')
+
+    def __init__(self, image, source_id: str = 'default', seq: int = 0, capture_ts: float = None, encoded=None):
+        self.image = image
+        self.source_id = source_id
+        self.seq = seq
+        self.capture_ts = time.monotonic() if capture_ts is None else capture_ts
+        self.stamps = {}
+        self.encoded = encoded
+        self._full = None
+
+    def stamp(self, stage: str):
+        now = time.monotonic()
+        self.stamps[stage] = now
+        return now
+
+    def age(self, now: float = None):
+        return (time.monotonic() if now is None else now) - self.capture_ts
+
+    def expired(self, max_age: float, now: float = None):
+        """True when the frame is older than the deadline (a falsy max_age disables it)."""
+        return bool(max_age) and self.age(now) > max_age
+
+    def full_res_crop(self, box):
+        """
+        Crop `box` (x1, y1, x2, y2 in `image` coordinates) from the full-resolution source.
+        The JPEG is decoded at most once per frame; without one the crop comes from `image`.
+        """
+        x1, y1, x2, y2 = box
+        if self.encoded is not None and self._full is None:
+            self._full = cv2.imdecode(np.frombuffer(self.encoded, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if self._full is None:
+                self.encoded = None
+        if self._full is None or self._full.shape[:2] == self.image.shape[:2]:
+            return self.image[y1:y2, x1:x2]
+
+        sy = self._full.shape[0] / self.image.shape[0]
+        sx = self._full.shape[1] / self.image.shape[1]
+        return self._full[int(y1 * sy):int(np.ceil(y2 * sy)), int(x1 * sx):int(np.ceil(x2 * sx))]
+
+    def with_image(self, image):
+        """Same source/seq/timestamps with different pixels (e.g. a rendered output view)."""
+        frame = Frame(image, self.source_id, self.seq, self.capture_ts)
+        frame.stamps = dict(self.stamps)
+        return frame
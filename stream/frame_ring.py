@@ -0,0 +1,219 @@
+import os
+import queue
+import time
+import logging
+from multiprocessing import shared_memory
+import cv2
+import numpy as np
+from stream.frame import Frame
+
+# Per-slot header record. seq == -1 marks a slot that is being written.
+_SLOT_DTYPE = np.dtype([
+    ('seq', np.int64),
+    ('timestamp', np.float64),
+    ('height', np.int32),
+    ('width', np.int32),
+    ('channels', np.int32),
+    ('_pad', np.int32),
+])
+# Ring-wide header: geometry (so other processes can attach by name) + last committed seq
+_META_FIELDS = 5   # slots, max_height, max_width, channels, write_seq
+
+
+class SharedFrameRing:
+    """
+    Fixed-size ring of preallocated frame slots in multiprocessing.shared_memory.
+    One producer writes frames (optionally decoding straight into a slot via acquire/commit);
+    any number of readers, in any process, get zero-copy views of the newest frame.
+
+    A view stays valid until the producer wraps around the ring (`slots` frames later, i.e.
+    slots / producer fps seconds), regardless of what the consumer is doing. get() therefore
+    copies the frame out of its slot unless `copy_on_get` is False, which is only safe when
+    every frame is finished with within that time (use is_valid(seq) to check).
+    Exposes publish/get/get_nowait so it can stand in for the frame hand-off slot.
+    """
+    def __init__(self, slots: int = 8, max_width: int = 1920, max_height: int = 1080, channels: int = 3,
+                 name: str = None, create: bool = True, source_id: str = 'default', copy_on_get: bool = True):
+        self.logger = logging.getLogger("AIPipeline")
+        self.name = name or f"frame_ring_{os.getpid()}"
+        self._owner = create
+        self.source_id = source_id
+        self.copy_on_get = copy_on_get
+        self._oversize_logged = False
+
+        if create:
+            meta_bytes = _META_FIELDS * 8
+            hdr_bytes = meta_bytes + slots * _SLOT_DTYPE.itemsize
+            self._hdr_shm = shared_memory.SharedMemory(name=f"{self.name}_hdr", create=True, size=hdr_bytes)
+            self._meta = np.ndarray((_META_FIELDS,), dtype=np.int64, buffer=self._hdr_shm.buf)
+            self._meta[:] = (slots, max_height, max_width, channels, 0)
+        else:
+            self._hdr_shm = shared_memory.SharedMemory(name=f"{self.name}_hdr")
+            self._meta = np.ndarray((_META_FIELDS,), dtype=np.int64, buffer=self._hdr_shm.buf)
+
+        self.slots, self.max_height, self.max_width, self.channels = (int(v) for v in self._meta[:4])
+        self.slot_bytes = self.max_height * self.max_width * self.channels
+        self._headers = np.ndarray((self.slots,), dtype=_SLOT_DTYPE, buffer=self._hdr_shm.buf, offset=_META_FIELDS * 8)
+
+        if create:
+            self._headers['seq'] = 0
+            self._data_shm = shared_memory.SharedMemory(name=f"{self.name}_data", create=True,
+                                                        size=self.slots * self.slot_bytes)
+        else:
+            self._data_shm = shared_memory.SharedMemory(name=f"{self.name}_data")
+
+        self._last_read = 0
+        self.dropped = 0
+
+    @classmethod
+    def attach(cls, name: str):
+        """Open an existing ring created by another process."""
+        return cls(name=name, create=False)
+
+    @classmethod
+    def from_config(cls, config: dict, source_id: str = 'default'):
+        shm_cfg = config.get('receive_img', {}).get('shared_memory', {})
+        base_name = shm_cfg.get('name') or f"frame_ring_{os.getpid()}"
+        return cls(
+            slots=int(shm_cfg.get('slots', 8)),
+            max_width=int(shm_cfg.get('max_width', 1920)),
+            max_height=int(shm_cfg.get('max_height', 1080)),
+            name=f"{base_name}_{source_id}",
+            source_id=source_id,
+            copy_on_get=shm_cfg.get('copy_on_get', True),
+        )
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+    def _slot_view(self, slot: int, height: int, width: int, channels: int):
+        return np.ndarray((height, width, channels), dtype=np.uint8, buffer=self._data_shm.buf,
+                          offset=slot * self.slot_bytes)
+
+    def acquire(self, height: int, width: int, channels: int = 3):
+        """
+        Reserve the next slot for in-place writing (e.g. cap.read(image=view)).
+        Returns (seq, view); call commit(seq, ...) once the view holds the frame.
+        An acquired slot that is never committed is simply reused by the next write.
+        """
+        if height * width * channels > self.slot_bytes:
+            raise ValueError(f"Frame {width}x{height}x{channels} exceeds ring slot size "
+                             f"{self.max_width}x{self.max_height}x{self.channels}")
+
+        seq = int(self._meta[4]) + 1
+        slot = seq % self.slots
+        self._headers['seq'][slot] = -1
+        return seq, self._slot_view(slot, height, width, channels)
+
+    def fits(self, height: int, width: int, channels: int = 3):
+        return height * width * channels <= self.slot_bytes
+
+    def commit(self, seq: int, height: int, width: int, channels: int = 3, timestamp: float = None):
+        slot = seq % self.slots
+        header = self._headers[slot]
+        header['timestamp'] = time.monotonic() if timestamp is None else timestamp
+        header['height'] = height
+        header['width'] = width
+        header['channels'] = channels
+        # Publish the slot before advancing the ring-wide counter
+        self._headers['seq'][slot] = seq
+        self._meta[4] = seq
+
+    def put(self, frame, timestamp: float = None, block=True, timeout=None):
+        """Copy a frame (ndarray or Frame) into the next slot, overwriting the oldest one. Never blocks."""
+        if isinstance(frame, Frame):
+            timestamp = frame.capture_ts if timestamp is None else timestamp
+            frame = frame.image
+        frame = frame if frame.ndim == 3 else frame[:, :, None]
+        height, width, channels = frame.shape
+        if not self.fits(height, width, channels) or height > self.max_height or width > self.max_width:
+            # Larger than a slot (e.g. a 4K camera on 1080p slots): shrink it to fit instead of failing
+            scale = min(self.max_width / width, self.max_height / height)
+            size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            if not self._oversize_logged:
+                self.logger.warning(f"[SharedFrameRing] {self.name}: {width}x{height} frames exceed the "
+                                    f"{self.max_width}x{self.max_height} slots. Downscaling to {size[0]}x{size[1]}.")
+                self._oversize_logged = True
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            frame = frame if frame.ndim == 3 else frame[:, :, None]
+            height, width, channels = frame.shape
+        seq, view = self.acquire(height, width, channels)
+        view[...] = frame
+        self.commit(seq, height, width, channels, timestamp)
+
+    def publish(self, frame, timestamp: float = None):
+        """Same hand-off API as LatestFrameSlot."""
+        self.put(frame, timestamp)
+
+    def full(self):
+        return False
+
+    # ------------------------------------------------------------------
+    # Consumer side
+    # ------------------------------------------------------------------
+    @property
+    def write_seq(self):
+        return int(self._meta[4])
+
+    def has_new(self):
+        return self.write_seq > self._last_read
+
+    def is_valid(self, seq: int):
+        """True while the slot that held `seq` has not been overwritten."""
+        return int(self._headers['seq'][seq % self.slots]) == seq
+
+    def get_with_meta(self, timeout: float = None, copy: bool = False):
+        """
+        Wait for a frame newer than the last one this reader saw and return
+        (seq, timestamp, frame). Raises queue.Empty on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        backoff = 0.0005
+
+        while True:
+            seq = self.write_seq
+            if seq > self._last_read:
+                slot = seq % self.slots
+                header = self._headers[slot].copy()
+                if header['seq'] == seq:
+                    frame = self._slot_view(slot, int(header['height']), int(header['width']), int(header['channels']))
+                    if copy:
+                        frame = frame.copy()
+                        if not self.is_valid(seq):
+                            continue   # overwritten while copying; take the newer frame instead
+                    if self._last_read:
+                        self.dropped += seq - self._last_read - 1
+                    self._last_read = seq
+                    return seq, float(header['timestamp']), frame
+
+            if deadline is not None and time.monotonic() >= deadline:
+                raise queue.Empty
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 0.005)
+
+    def get(self, block=True, timeout: float = None):
+        """Newest frame as a Frame envelope (a zero-copy view into the slot when copy_on_get is False)."""
+        seq, timestamp, image = self.get_with_meta(timeout=timeout if block else 0, copy=self.copy_on_get)
+        return Frame(image, self.source_id, seq, timestamp)
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def stats(self):
+        """Same counters as LatestFrameSlot.stats(); dropped = frames overwritten before this reader got them."""
+        return {'published': self.write_seq, 'dropped': self.dropped}
+
+    def close(self):
+        self._headers = None
+        self._meta = None
+        try:
+            self._hdr_shm.close()
+            self._data_shm.close()
+        except BufferError:
+            # A consumer still holds a view; the OS releases the mapping at process exit
+            self.logger.debug(f"[SharedFrameRing] {self.name} still has live views at close.")
+
+    def unlink(self):
+        if self._owner:
+            self._hdr_shm.unlink()
+            self._data_shm.unlink()
@@ -0,0 +1,114 @@
+import hashlib
+import time
+
+
+class PollState:
+    """
+    Per-source state that lets an HTTP snapshot poller avoid redundant work:
+      - ETag / Last-Modified validators -> conditional requests (304 = nothing to download)
+      - the image URL resolved from an HTML page is cached for `resolve_ttl` seconds
+      - a content hash so identical bytes are never decoded or inferred twice
+      - a poll interval that adapts to how often the source actually changes
+    Shared by HTTPRECEIVEProducer and AsyncHTTPIngestor.
+    """
+    def __init__(self, base_url: str, min_interval: float = 0.2, max_interval: float = 5.0,
+                 resolve_ttl: float = 30.0, adaptive: bool = True, interval: float = 1.0):
+        self.base_url = base_url
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.resolve_ttl = resolve_ttl
+        self.adaptive = adaptive
+        self.interval = min(max(interval, min_interval), max_interval)
+
+        self._validators = {}        # url -> {'If-None-Match': ..., 'If-Modified-Since': ...}
+        self._image_url = None
+        self._resolved_at = 0.0
+        self._last_digest = None
+        self._last_change = None
+        self._change_period = None   # EWMA of the observed time between content changes
+
+        self.not_modified = 0
+        self.duplicates = 0
+        self.changes = 0
+
+    @classmethod
+    def from_config(cls, base_url: str, config: dict, interval: float = None):
+        http_cfg = config.get('receive_img', {}).get('http', {})
+        min_interval = float(http_cfg.get('min_interval', 0.2))
+        # Never poll faster than the ingest frame-rate cap
+        fps = float(config.get('receive_img', {}).get('ingest', {}).get('fps', 0) or 0)
+        if fps > 0:
+            min_interval = max(min_interval, 1.0 / fps)
+        return cls(
+            base_url,
+            min_interval=min_interval,
+            max_interval=float(http_cfg.get('max_interval', 5.0)),
+            resolve_ttl=float(http_cfg.get('resolve_ttl', 30.0)),
+            adaptive=http_cfg.get('adaptive', True),
+            interval=float(interval or http_cfg.get('interval', 1.0)),
+        )
+
+    # ------------------------------------------------------------------
+    # URL resolution and conditional requests
+    # ------------------------------------------------------------------
+    def request_url(self):
+        """Cached image URL while it is fresh, otherwise the configured (page or image) URL."""
+        if self._image_url and time.monotonic() - self._resolved_at < self.resolve_ttl:
+            return self._image_url
+        return self.base_url
+
+    def resolved(self, image_url: str):
+        self._image_url = image_url
+        self._resolved_at = time.monotonic()
+
+    def invalidate(self):
+        """Forget the cached image URL (e.g. it started returning 404)."""
+        self._image_url = None
+
+    def conditional_headers(self, url: str):
+        return dict(self._validators.get(url, {}))
+
+    def remember_validators(self, url: str, headers):
+        validators = {}
+        if headers.get('ETag'):
+            validators['If-None-Match'] = headers['ETag']
+        if headers.get('Last-Modified'):
+            validators['If-Modified-Since'] = headers['Last-Modified']
+        if validators:
+            self._validators[url] = validators
+        else:
+            self._validators.pop(url, None)
+
+    # ------------------------------------------------------------------
+    # Change detection and adaptive rate
+    # ------------------------------------------------------------------
+    def is_new_content(self, data):
+        """False when the bytes are identical to the last image seen."""
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        if digest == self._last_digest:
+            self.duplicates += 1
+            return False
+        self._last_digest = digest
+        return True
+
+    def on_poll(self, changed: bool):
+        """Update the poll interval after a poll that did (or did not) yield a new image."""
+        now = time.monotonic()
+        if changed:
+            self.changes += 1
+            if self._last_change is not None:
+                observed = now - self._last_change
+                self._change_period = observed if self._change_period is None else 0.7 * self._change_period + 0.3 * observed
+            self._last_change = now
+
+        if not self.adaptive:
+            return
+
+        if changed and self._change_period is not None:
+            # Poll about twice per expected change to keep latency low without over-polling
+            target = self._change_period / 2
+        elif changed:
+            target = self.interval
+        else:
+            target = self.interval * 1.25
+        self.interval = min(max(target, self.min_interval), self.max_interval)
@@ -1,17 +1,36 @@
-import cv2
-import queue
 import time
 import requests
-import numpy as np
 from urllib.parse import urljoin
 
 # Import the base template
 from stream.base_input import BaseInputProducer
+from stream.http_poll import PollState
+from stream.ingest import IngestScaler
+
+
+def extract_image_url(html: str, base_url: str):
+    """Absolute URL of the first <img src="..."> in a snapshot page, or None."""
+    if 'src="' not in html:
+        return None
+    # Extract the image path (e.g., /media/pic.jpg) and safely join it with the base URL
+    img_path = html.split('src="')[1].split('"')[0]
+    return urljoin(base_url, img_path)
+
 
 class HTTPRECEIVEProducer(BaseInputProducer):
-    def __init__(self, http_url: str, frame_queue: queue.Queue):
+    def __init__(self, http_url: str, frame_queue, source_id: str = 'default', config: dict = None,
+                 interval: float = None, timeout: float = None):
         # Pass variables to the parent class (BaseInputProducer)
-        super().__init__(source_url=http_url, frame_queue=frame_queue)
+        super().__init__(source_url=http_url, frame_queue=frame_queue, source_id=source_id)
+        
+        http_cfg = (config or {}).get('receive_img', {}).get('http', {})
+        self.timeout = float(timeout or http_cfg.get('timeout', 3.0))
+        self.retry_delay = 3.0
+        
+        # Validators, cached image URL, content hash and adaptive interval for this source
+        self.poll = PollState.from_config(http_url, config or {}, interval)
+        # Reduced-resolution JPEG decode (receive_img.ingest)
+        self.ingest = IngestScaler.from_config(config or {})
         
         # Use requests.Session() for better performance on repeated requests
         self.session = requests.Session()
@@ -23,85 +42,99 @@ class HTTPRECEIVEProducer(BaseInputProducer):
         """Log the initial polling action."""
         self.logger.info(f"[HTTPProducer] Starting to poll images from: {self.source_url}")
 
+    def _get(self, url: str):
+        """Conditional GET. Returns None when the server answers 304 Not Modified."""
+        response = self.session.get(url, headers=self.poll.conditional_headers(url), timeout=self.timeout)
+        if response.status_code == 304:
+            self.poll.not_modified += 1
+            return None
+        response.raise_for_status()
+        return response
+
+    def _fetch_bytes(self):
+        """Bytes of a new image, or None when the source has not changed since the last poll."""
+        url = self.poll.request_url()
+        response = self._get(url)
+        if response is None:
+            return None
+        
+        # --- Case 2: Server returns HTML containing an image tag ---
+        # Resolve it once and reuse the image URL until resolve_ttl expires or it fails
+        if 'image' not in response.headers.get('Content-Type', ''):
+            img_url = extract_image_url(response.text, url)
+            if img_url is None:
+                self.logger.warning("[HTTPProducer] No image tag found in HTML. Check media folder.")
+                return None
+            self.poll.resolved(img_url)
+            url = img_url
+            response = self._get(url)
+            if response is None:
+                return None
+        
+        # --- Case 1: Server returns an image file directly ---
+        self.poll.remember_validators(url, response.headers)
+        data = response.content
+        # Identical bytes (server without validators) -> nothing to decode or infer
+        return data if self.poll.is_new_content(data) else None
+
     def _fetch_image(self):
-        """Fetch the latest image. Handles both direct image and HTML responses."""
+        """
+        Poll once. Returns (ok, frame, encoded): ok is False on connection errors,
+        frame is None when the image did not change, encoded holds the JPEG when
+        it was decoded at reduced resolution and OCR wants full-resolution crops.
+        """
         try:
-            # 1. Send GET request to the server
-            response = self.session.get(self.source_url, timeout=3)
-            response.raise_for_status()
+            data = self._fetch_bytes()
             
             # If the connection was previously lost, log the recovery
             if not self.is_connected:
                 self.logger.info("[HTTPProducer] Connection re-established successfully.")
                 self.is_connected = True
             
-            # 2. Check the Content-Type header to determine the response format
-            content_type = response.headers.get('Content-Type', '')
+            if data is None:
+                return True, None, None
             
-            # --- Case 1: Server returns an image file directly ---
-            if 'image' in content_type:
-                # Convert bytes directly to an OpenCV frame
-                image_array = np.asarray(bytearray(response.content), dtype=np.uint8)
-                frame = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
-                return frame
-                
-            # --- Case 2: Server returns HTML containing an image tag ---
-            else:
-                html = response.text
-                if 'src="' in html:
-                    # Extract the image path (e.g., /media/pic.jpg)
-                    img_path = html.split('src="')[1].split('"')[0]
-                    
-                    # Safely join the base URL with the extracted path
-                    img_url = urljoin(self.source_url, img_path)
-                    
-                    # Request the actual image file
-                    img_response = self.session.get(img_url, timeout=3)
-                    img_response.raise_for_status()
-                    
-                    # Convert to OpenCV frame
-                    image_array = np.asarray(bytearray(img_response.content), dtype=np.uint8)
-                    frame = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
-                    return frame
-                else:
-                    # Only warn if connected but no image tag is found
-                    self.logger.warning("[HTTPProducer] No image tag found in HTML. Check media folder.")
-                    return None
+            # Convert bytes directly to an OpenCV frame (no intermediate copy), at ingest resolution
+            frame, factor = self.ingest.decode_jpeg(data)
+            if frame is None:
+                self.logger.error("[HTTPProducer] Failed to decode image.")
+                return False, None, None
+            encoded = data if self.ingest.full_res_ocr and factor > 1 else None
+            return True, frame, encoded
                     
         except requests.exceptions.RequestException as e:
+            # The cached image URL may have gone stale; resolve it again on the next poll
+            self.poll.invalidate()
             # Gracefully handle server down/network drop without spamming the log
             if self.is_connected:
                 self.logger.warning(f"[HTTPProducer] Connection lost. Server might be down. Retrying in background...")
                 self.is_connected = False
-            return None
+            return False, None, None
             
         except Exception as e:
             self.logger.error(f"[HTTPProducer] Failed to decode image: {e}")
-            return None
+            return False, None, None
 
     def run(self):
-        """Continuously poll the server and put frames into the queue."""
+        """Continuously poll the server and publish frames to the hand-off slot."""
         self._connect()
 
         while self.running:
-            frame = self._fetch_image()
+            ok, frame, encoded = self._fetch_image()
             
-            if frame is not None:
-                # Ensure the queue only contains the absolute latest frame
-                if self.frame_queue.full():
-                    try:
-                        self.frame_queue.get_nowait() 
-                    except queue.Empty:
-                        pass
-                        
-                self.frame_queue.put(frame)
-                self.logger.debug("[HTTPProducer] Successfully grabbed a frame and put it in queue.")
+            if ok:
+                if frame is not None:
+                    # The slot only ever holds the absolute latest frame
+                    self._publish(frame, encoded=encoded)
+                    self.logger.debug("[HTTPProducer] Successfully grabbed a frame and published it.")
                 
-                # Normal polling interval (1 second)
-                time.sleep(1.0)
+                # Adaptive polling interval: shorter while the image keeps changing, longer while static
+                self.poll.on_poll(frame is not None)
+                time.sleep(self.poll.interval)
             else:
                 # If disconnected or error occurred, wait 3 seconds before trying again 
                 # (Matches RTSP reconnect behavior and saves CPU)
-                time.sleep(3.0)
+                time.sleep(self.retry_delay)
         
-        self.logger.info("[HTTPProducer] Thread stopped cleanly.")
\ No newline at end of file
+        self.logger.info(f"[HTTPProducer] Thread stopped cleanly. (new images: {self.poll.changes}, "
+                         f"not modified: {self.poll.not_modified}, duplicates: {self.poll.duplicates})")
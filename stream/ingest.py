@@ -0,0 +1,128 @@
+import time
+import cv2
+import numpy as np
+
+# SOFn markers carry the image size (C4 = DHT, C8 = JPG extension, CC = DAC are not frames)
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_REDUCED_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+
+def jpeg_size(data):
+    """(width, height) from the SOF header of a JPEG buffer, or None when it cannot be parsed."""
+    n = len(data)
+    if n < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+
+    i = 2
+    while i + 9 < n:
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:                        # fill byte
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:   # markers without a length field
+            i += 2
+            continue
+        if marker == 0xDA:                        # start of scan before any SOF
+            return None
+        if marker in _SOF_MARKERS:
+            height = (data[i + 5] << 8) | data[i + 6]
+            width = (data[i + 7] << 8) | data[i + 8]
+            return width, height
+        i += 2 + ((data[i + 2] << 8) | data[i + 3])
+    return None
+
+
+class IngestScaler:
+    """
+    Ingest resolution / frame-rate policy shared by the input producers (receive_img.ingest).
+      - width / height: target size; 0 keeps the source size on that axis.
+        RTSP scales to exactly this in GStreamer; JPEG sources decode at the smallest
+        1/2, 1/4 or 1/8 libjpeg scale that is still at least this large.
+      - fps: maximum frames per second handed to the pipeline (0 = no decimation).
+      - full_res_ocr: keep the encoded JPEG on the Frame so OCR can crop from full resolution.
+    """
+    def __init__(self, width: int = 0, height: int = 0, fps: float = 0, full_res_ocr: bool = False):
+        self.width = int(width or 0)
+        self.height = int(height or 0)
+        self.fps = float(fps or 0)
+        self.full_res_ocr = full_res_ocr
+        self._min_interval = 1.0 / self.fps if self.fps > 0 else 0.0
+        self._last_emit = 0.0
+
+    @classmethod
+    def from_config(cls, config: dict):
+        ingest_cfg = config.get('receive_img', {}).get('ingest', {})
+        return cls(
+            width=ingest_cfg.get('width', 0),
+            height=ingest_cfg.get('height', 0),
+            fps=ingest_cfg.get('fps', 0),
+            full_res_ocr=ingest_cfg.get('full_res_ocr', False),
+        )
+
+    @property
+    def scaling(self):
+        return bool(self.width or self.height)
+
+    # ------------------------------------------------------------------
+    # Frame-rate decimation
+    # ------------------------------------------------------------------
+    def due(self, now: float = None):
+        """True when enough time has passed since the last accepted frame (and accepts it)."""
+        if not self._min_interval:
+            return True
+        now = time.monotonic() if now is None else now
+        if now - self._last_emit < self._min_interval:
+            return False
+        self._last_emit = now
+        return True
+
+    # ------------------------------------------------------------------
+    # RTSP / GStreamer
+    # ------------------------------------------------------------------
+    def gst_elements(self):
+        """Pipeline fragment placed after the decoder, before videoconvert (scale in YUV, convert fewer pixels)."""
+        elements = ''
+        if self.fps > 0:
+            elements += f'videorate drop-only=true ! video/x-raw,framerate={int(round(self.fps * 1000))}/1000 ! '
+        if self.scaling:
+            caps = ','.join(f'{k}={v}' for k, v in (('width', self.width), ('height', self.height)) if v)
+            elements += f'videoscale ! video/x-raw,{caps} ! '
+        return elements
+
+    def resize(self, image):
+        """CPU fallback when the decoder could not scale (e.g. OpenCV's default RTSP backend)."""
+        if not self.scaling:
+            return image
+        h, w = image.shape[:2]
+        new_w = self.width or int(round(w * self.height / h))
+        new_h = self.height or int(round(h * self.width / w))
+        if (new_w, new_h) == (w, h):
+            return image
+        return cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_AREA)
+
+    # ------------------------------------------------------------------
+    # JPEG
+    # ------------------------------------------------------------------
+    def jpeg_reduction(self, data):
+        """(imread flag, scale factor) for decoding this JPEG no larger than needed."""
+        if not self.scaling:
+            return cv2.IMREAD_COLOR, 1
+        size = jpeg_size(data)
+        if size is None:
+            return cv2.IMREAD_COLOR, 1
+        width, height = size
+        for factor, flag in _REDUCED_FLAGS:
+            if width // factor >= self.width and height // factor >= self.height:
+                return flag, factor
+        return cv2.IMREAD_COLOR, 1
+
+    def decode_jpeg(self, data):
+        """
+        Decode JPEG bytes (bytes/bytearray/memoryview, no copy) at ingest resolution.
+        Returns (image, scale) where scale = full-resolution size / decoded size.
+        """
+        flag, factor = self.jpeg_reduction(data)
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flag)
+        return image, factor
@@ -1,29 +1,97 @@
-import queue
 from stream.rtsp_rev import RTSPRECEIVEProducer
 from stream.http_rev import HTTPRECEIVEProducer
+from stream.mjpeg_rev import MJPEGRECEIVEProducer
+from stream.async_http_rev import AsyncHTTPIngestor
 
 class InputFactory:
     """
     Factory Pattern for creating Input Producers based on the selected mode.
     """
     
+    # CLI/config aliases -> canonical producer mode
+    MODE_ALIASES = {'rtsp': 'video', 'http': 'image'}
+    
+    @staticmethod
+    def get_sources(mode: str, config: dict):
+        """
+        List of sources as dicts {id, mode, url}.
+        Uses receive_img.sources when configured, otherwise a single 'default' source for --mode.
+        """
+        sources = config['receive_img'].get('sources') or []
+        if not sources:
+            return [{'id': 'default', 'mode': mode, 'url': None, 'interval': None, 'timeout': None}]
+        
+        specs = []
+        for i, source in enumerate(sources):
+            specs.append({
+                'id': str(source.get('id', f"cam{i}")),
+                'mode': source.get('mode', mode),
+                'url': source.get('url'),
+                'interval': source.get('interval'),
+                'timeout': source.get('timeout'),
+            })
+        
+        ids = [spec['id'] for spec in specs]
+        if len(set(ids)) != len(ids):
+            raise ValueError(f"Duplicate source ids in receive_img.sources: {ids}")
+        return specs
+    
     @staticmethod
-    def create_producer(mode: str, config: dict, frame_queue: queue.Queue):
+    def create_producer(mode: str, config: dict, frame_queue, source_id: str = 'default', url: str = None,
+                        interval: float = None, timeout: float = None):
         """
         Decision maker for creating the appropriate Producer.
         """
+        mode = InputFactory.MODE_ALIASES.get(mode, mode)
+        
         if mode == 'video':
            
-            url = config['receive_img']['rtsp_url']
+            url = url or config['receive_img']['rtsp_url']
             
-            return RTSPRECEIVEProducer(rtsp_url=url, frame_queue=frame_queue)
+            return RTSPRECEIVEProducer(rtsp_url=url, frame_queue=frame_queue, source_id=source_id, config=config)
             
         elif mode == 'image':
          
-            url = config['receive_img']['http_url']
+            url = url or config['receive_img']['http_url']
+            
+            return HTTPRECEIVEProducer(http_url=url, frame_queue=frame_queue, source_id=source_id,
+                                       config=config, interval=interval, timeout=timeout)
             
+        elif mode == 'mjpeg':
             
+            url = url or config['receive_img']['mjpeg_url']
             
-            return HTTPRECEIVEProducer(http_url=url, frame_queue=frame_queue)
+            return MJPEGRECEIVEProducer(mjpeg_url=url, frame_queue=frame_queue, source_id=source_id,
+                                        config=config, timeout=timeout)
         else:
-            raise ValueError(f"Unknown input mode: {mode}")
\ No newline at end of file
+            raise ValueError(f"Unknown input mode: {mode}")
+    
+    @staticmethod
+    def create_producers(sources: list, config: dict, frame_queues: dict):
+        """
+        Producers for every source. With receive_img.http.engine = "async", all HTTP snapshot
+        sources share one AsyncHTTPIngestor instead of one polling thread each.
+        """
+        async_http = config['receive_img'].get('http', {}).get('engine', 'thread') == 'async'
+        producers = []
+        http_sources = []
+        
+        for source in sources:
+            mode = InputFactory.MODE_ALIASES.get(source['mode'], source['mode'])
+            if async_http and mode == 'image':
+                http_sources.append(dict(
+                    source,
+                    url=source['url'] or config['receive_img']['http_url'],
+                    frame_queue=frame_queues[source['id']]
+                ))
+                continue
+            
+            producers.append(InputFactory.create_producer(
+                mode=mode, config=config, frame_queue=frame_queues[source['id']],
+                source_id=source['id'], url=source['url'],
+                interval=source.get('interval'), timeout=source.get('timeout')
+            ))
+        
+        if http_sources:
+            producers.append(AsyncHTTPIngestor(http_sources, config))
+        return producers
@@ -0,0 +1,68 @@
+import queue
+import threading
+import time
+
+
+class LatestFrameSlot:
+    """
+    Single-value hand-off with overwrite-on-publish semantics: the newest value always wins,
+    publish() never blocks, and an unconsumed value that gets overwritten is counted as dropped.
+    get()/get_nowait() raise queue.Empty like queue.Queue so consumers can use either.
+
+    Several slots may share one `condition` so a consumer can wait on all of them at once (wait_any).
+    """
+    def __init__(self, condition: threading.Condition = None):
+        self._cond = condition or threading.Condition()
+        self._value = None
+        self._version = 0
+        self._consumed = 0
+        self.published = 0
+        self.dropped = 0
+
+    def publish(self, value):
+        with self._cond:
+            if self._version > self._consumed:
+                self.dropped += 1
+            self._value = value
+            self._version += 1
+            self.published += 1
+            self._cond.notify_all()
+
+    def has_new(self):
+        return self._version > self._consumed
+
+    def get(self, block=True, timeout=None):
+        with self._cond:
+            if not self.has_new():
+                if not block or not self._cond.wait_for(self.has_new, timeout):
+                    raise queue.Empty
+            self._consumed = self._version
+            return self._value
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def stats(self):
+        return {'published': self.published, 'dropped': self.dropped}
+
+
+def wait_any(slots, timeout: float = None):
+    """
+    Block until at least one hand-off has an unconsumed value. Returns False on timeout.
+    LatestFrameSlots sharing one condition are waited on without polling; anything else
+    (e.g. SharedFrameRing) is polled.
+    """
+    slots = list(slots)
+    conditions = {id(getattr(s, '_cond', None)) for s in slots}
+
+    if all(isinstance(s, LatestFrameSlot) for s in slots) and len(conditions) == 1:
+        cond = slots[0]._cond
+        with cond:
+            return cond.wait_for(lambda: any(s.has_new() for s in slots), timeout)
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while not any(s.has_new() for s in slots):
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        time.sleep(0.002)
+    return True
@@ -0,0 +1,260 @@
+import time
+import requests
+
+from stream.base_input import BaseInputProducer
+from stream.ingest import IngestScaler
+
+
+class MJPEGRECEIVEProducer(BaseInputProducer):
+    """
+    Reads a multipart/x-mixed-replace MJPEG stream over one persistent HTTP connection.
+    Parts are located incrementally in a reusable buffer by their Content-Length, or by the
+    next multipart boundary when a part has none; streams without a declared boundary fall
+    back to scanning for the SOI/EOI markers. When several complete frames arrived in one
+    read only the newest is decoded (at ingest resolution, and only if the ingest fps cap
+    allows another frame).
+    """
+    SOI = b'\xff\xd8'
+    EOI = b'\xff\xd9'
+
+    def __init__(self, mjpeg_url: str, frame_queue, source_id: str = 'default', config: dict = None,
+                 timeout: float = None):
+        super().__init__(source_url=mjpeg_url, frame_queue=frame_queue, source_id=source_id)
+
+        mjpeg_cfg = (config or {}).get('receive_img', {}).get('mjpeg', {})
+        self.chunk_size = int(mjpeg_cfg.get('chunk_size', 65536))
+        self.max_buffer = int(mjpeg_cfg.get('max_buffer_bytes', 8 * 1024 * 1024))
+        self.timeout = float(timeout or mjpeg_cfg.get('timeout', 5.0))
+        self.retry_delay = 3.0
+        self.ingest = IngestScaler.from_config(config or {})
+
+        self.session = requests.Session()
+        self.response = None
+        self._read = None
+
+        # Receive buffer. Bytes are appended at the end and consumed frames trimmed from the
+        # front; bytearray keeps its allocation across both so it is reused for the whole stream.
+        self.buffer = bytearray()
+        self._start = -1    # offset of the frame being received (-1 = none yet)
+        self._scan = 0      # where the next search resumes
+        self._length = -1   # Content-Length of the part being received (-1 = unknown)
+        self.delimiter = None   # b'--<boundary>' from the Content-Type, None = marker scan
+
+        self.skipped = 0
+        self.is_connected = True
+
+    def _connect(self):
+        """Open (or re-open) the streaming connection."""
+        self._close_response()
+        self.logger.info(f"[MJPEGProducer] Connecting to: {self.source_url}")
+
+        response = self.session.get(self.source_url, stream=True, timeout=(self.timeout, self.timeout))
+        response.raise_for_status()
+        content_type = response.headers.get('Content-Type', '')
+        if 'multipart' not in content_type:
+            self.logger.warning(f"[MJPEGProducer] Unexpected Content-Type '{content_type}', parsing JPEG markers anyway.")
+        self.delimiter = self._boundary(content_type)
+        if self.delimiter is None:
+            self.logger.warning("[MJPEGProducer] No multipart boundary declared. Splitting frames on JPEG markers.")
+
+        raw = response.raw
+        # read1() returns whatever already arrived instead of waiting for a full chunk;
+        # older urllib3 only has read(), so keep its chunks small to bound the added latency
+        read1 = getattr(raw, 'read1', None)
+        self._read = (lambda: read1(self.chunk_size)) if read1 else (lambda: raw.read(4096))
+
+        self.response = response
+        self.buffer.clear()
+        self._start, self._scan, self._length = -1, 0, -1
+        self.logger.info("[MJPEGProducer] Connect established successfully.")
+
+    @staticmethod
+    def _boundary(content_type: str):
+        """Delimiter line of the multipart stream, or None when the Content-Type declares no boundary."""
+        for param in content_type.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.lower() == 'boundary' and value.strip().strip('"'):
+                boundary = value.strip().strip('"').encode('latin-1')
+                # Some cameras already put the leading dashes into the declared boundary
+                return boundary if boundary.startswith(b'--') else b'--' + boundary
+        return None
+
+    @staticmethod
+    def _content_length(headers):
+        for line in bytes(headers).split(b'\r\n'):
+            name, _, value = line.partition(b':')
+            if name.strip().lower() == b'content-length':
+                try:
+                    return int(value.strip())
+                except ValueError:
+                    return -1
+        return -1
+
+    def _close_response(self):
+        if self.response is not None:
+            try:
+                self.response.close()
+            except Exception:
+                pass
+        self.response = None
+
+    def _find_frames(self):
+        """
+        Advance the search over newly received bytes.
+        Returns ((start, end) of the newest complete JPEG or None, number of complete JPEGs found).
+        """
+        if self.delimiter is not None:
+            return self._find_parts()
+        return self._find_markers()
+
+    def _find_parts(self):
+        """
+        Multipart framing: a part body is Content-Length bytes after its headers, or runs up
+        to the next boundary. Unlike the marker scan this never cuts a JPEG at the EOI of an
+        embedded EXIF thumbnail.
+        """
+        buf = self.buffer
+        delimiter = self.delimiter
+        latest, found = None, 0
+
+        while True:
+            if self._start < 0:
+                pos = buf.find(delimiter, self._scan)
+                if pos < 0:
+                    # Keep a possible partial delimiter at the end
+                    self._scan = max(len(buf) - len(delimiter) + 1, 0)
+                    break
+                header_end = buf.find(b'\r\n\r\n', pos)
+                if header_end < 0:
+                    # Part headers not complete yet; resume from the delimiter
+                    self._scan = pos
+                    break
+                with memoryview(buf)[pos:header_end] as headers:
+                    self._length = self._content_length(headers)
+                self._start = header_end + 4
+                self._scan = self._start
+
+            if self._length >= 0:
+                end = self._start + self._length
+                if len(buf) < end:
+                    break
+                self._scan = end
+            else:
+                end = buf.find(delimiter, self._scan)
+                if end < 0:
+                    self._scan = max(len(buf) - len(delimiter) + 1, self._start)
+                    break
+                self._scan = end
+                # The CRLF before the delimiter belongs to the boundary, not to the body
+                if end - 2 >= self._start and buf[end - 2:end] == b'\r\n':
+                    end -= 2
+
+            latest = (self._start, end)
+            found += 1
+            self._start = -1
+
+        return latest, found
+
+    def _find_markers(self):
+        """Fallback framing on the JPEG SOI/EOI markers for streams without a declared boundary."""
+        buf = self.buffer
+        latest, found = None, 0
+
+        while True:
+            if self._start < 0:
+                start = buf.find(self.SOI, self._scan)
+                if start < 0:
+                    # Keep the last byte: it may be the first half of a marker
+                    self._scan = max(len(buf) - 1, 0)
+                    break
+                self._start = start
+                self._scan = start + 2
+
+            end = buf.find(self.EOI, self._scan)
+            if end < 0:
+                self._scan = max(len(buf) - 1, self._start + 2)
+                break
+
+            latest = (self._start, end + 2)
+            found += 1
+            self._start = -1
+            self._scan = end + 2
+
+        return latest, found
+
+    def _compact(self):
+        """Drop bytes that can no longer be part of a frame."""
+        cut = self._start if self._start >= 0 else self._scan
+        if cut:
+            del self.buffer[:cut]
+            self._scan -= cut
+            if self._start >= 0:
+                self._start -= cut
+
+        if len(self.buffer) > self.max_buffer:
+            self.logger.warning("[MJPEGProducer] No complete JPEG within max_buffer_bytes. Resynchronising...")
+            self.buffer.clear()
+            self._start, self._scan, self._length = -1, 0, -1
+
+    def _decode(self, start: int, end: int):
+        """(image, encoded) for the JPEG at buffer[start:end]."""
+        # Decode straight from the receive buffer; the view is released before the buffer is trimmed
+        with memoryview(self.buffer)[start:end] as jpeg:
+            image, factor = self.ingest.decode_jpeg(jpeg)
+            # The buffer is reused, so a JPEG kept for full-resolution OCR crops must be copied out
+            encoded = bytes(jpeg) if self.ingest.full_res_ocr and factor > 1 else None
+        return image, encoded
+
+    def run(self):
+        """Read the stream, publish the newest frame of every read and reconnect on errors."""
+        while self.running:
+            if self.response is None:
+                try:
+                    self._connect()
+                    self.is_connected = True
+                except requests.exceptions.RequestException as e:
+                    if self.is_connected:
+                        self.logger.warning(f"[MJPEGProducer] Connection failed ({e}). Retrying in background...")
+                        self.is_connected = False
+                    self._close_response()
+                    time.sleep(self.retry_delay)
+                    continue
+
+            try:
+                chunk = self._read()
+            except Exception as e:
+                if self.running:
+                    self.logger.warning(f"[MJPEGProducer] Stream lost ({e}). Reconnecting...")
+                self._close_response()
+                continue
+
+            if not chunk:
+                self.logger.warning("[MJPEGProducer] Stream ended by server. Reconnecting...")
+                self._close_response()
+                continue
+
+            self.buffer += chunk
+            latest, found = self._find_frames()
+
+            if latest is not None and not self.ingest.due():
+                # Above the ingest fps cap: drop without decoding
+                self.skipped += found
+            elif latest is not None:
+                # Older complete frames in the same read are stale: skip their decode entirely
+                self.skipped += found - 1
+                frame, encoded = self._decode(*latest)
+                if frame is not None:
+                    self._publish(frame, encoded=encoded)
+                    self.logger.debug("[MJPEGProducer] Successfully decoded a frame and published it.")
+                else:
+                    self.logger.error("[MJPEGProducer] Failed to decode JPEG frame.")
+
+            self._compact()
+
+        self._close_response()
+        self.logger.info(f"[MJPEGProducer] Thread stopped cleanly. (skipped frames: {self.skipped})")
+
+    def stop(self):
+        super().stop()
+        # Unblock a read waiting on the socket
+        self._close_response()
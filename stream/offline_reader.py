@@ -0,0 +1,161 @@
+import os
+import queue
+import threading
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+
+from stream.frame import Frame
+from stream.ingest import IngestScaler
+
+VIDEO_EXTS = {'.mp4', '.avi', '.mkv', '.mov', '.m4v', '.ts', '.mpg', '.mpeg', '.wmv'}
+IMAGE_EXTS = {'.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp'}
+
+
+class OfflineFrameReader(threading.Thread):
+    """
+    Reads archived footage for --mode offline: a video file, an image folder, or a folder of videos.
+    Unlike the live producers nothing is ever dropped: decoded frames go into a bounded queue with
+    a blocking put, so decoding simply waits whenever inference falls behind. None marks the end.
+
+    Every video file is its own source (id = path relative to the input, without extension) and
+    is decoded sequentially by one pool worker; several videos decode in parallel. An image folder
+    is one source whose files are decoded by the whole pool and queued in name order.
+    """
+    def __init__(self, input_path: str, config: dict):
+        super().__init__(name="OfflineReader")
+        offline_cfg = config.get('offline', {})
+        self.decode_workers = max(1, int(offline_cfg.get('decode_workers', 4)))
+        self.frame_stride = max(1, int(offline_cfg.get('frame_stride', 1)))
+        self.frames = queue.Queue(maxsize=max(1, int(offline_cfg.get('prefetch', 64))))
+        self.ingest = IngestScaler.from_config(config)
+
+        self.input_path = os.path.abspath(input_path)
+        self.videos, self.images = self._scan(self.input_path)
+        if not self.videos and not self.images:
+            raise FileNotFoundError(f"No video or image files found at {input_path}")
+
+        # (source_id, seq) -> where the frame came from; popped by the result writer
+        self.origins = {}
+        self.decoded = 0
+        self.running = True
+        self.daemon = True
+        self.logger = logging.getLogger("AIPipeline")
+
+    @staticmethod
+    def _scan(path: str):
+        """(video files, image files) under `path`, sorted."""
+        if os.path.isfile(path):
+            ext = os.path.splitext(path)[1].lower()
+            return ([path], []) if ext not in IMAGE_EXTS else ([], [path])
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"Offline input not found: {path}")
+
+        videos, images = [], []
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                ext = os.path.splitext(name)[1].lower()
+                if ext in VIDEO_EXTS:
+                    videos.append(os.path.join(root, name))
+                elif ext in IMAGE_EXTS:
+                    images.append(os.path.join(root, name))
+        return videos, images
+
+    def _relpath(self, path: str):
+        base = self.input_path if os.path.isdir(self.input_path) else os.path.dirname(self.input_path)
+        return os.path.relpath(path, base)
+
+    def _put(self, frame, origin: dict):
+        """Blocking put (no frame is ever dropped) that gives up once stop() was called."""
+        self.origins[(frame.source_id, frame.seq)] = origin
+        while self.running:
+            try:
+                self.frames.put(frame, timeout=0.5)
+                self.decoded += 1
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _read_video(self, path: str):
+        source_id = os.path.splitext(self._relpath(path))[0]
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            self.logger.error(f"[OfflineReader] Cannot open video: {path}")
+            return
+
+        self.logger.info(f"[OfflineReader] Decoding {path} "
+                         f"({int(cap.get(cv2.CAP_PROP_FRAME_COUNT))} frames) as source '{source_id}'")
+        index = 0
+        try:
+            while self.running:
+                # Skipped frames are only grabbed, not converted to BGR
+                if index % self.frame_stride:
+                    if not cap.grab():
+                        break
+                    index += 1
+                    continue
+
+                ret, image = cap.read()
+                if not ret:
+                    break
+                origin = {'file': self._relpath(path), 'pos_ms': round(cap.get(cv2.CAP_PROP_POS_MSEC), 1)}
+                if not self._put(Frame(self.ingest.resize(image), source_id, index), origin):
+                    break
+                index += 1
+        finally:
+            cap.release()
+
+    def _decode_image(self, path: str):
+        data = np.fromfile(path, dtype=np.uint8)
+        image, factor = self.ingest.decode_jpeg(data)
+        return image, (data if self.ingest.full_res_ocr and factor > 1 else None)
+
+    def _read_images(self, pool):
+        source_id = os.path.basename(self.input_path.rstrip(os.sep)) or 'images'
+        self.logger.info(f"[OfflineReader] Decoding {len(self.images)} images as source '{source_id}'")
+
+        # Keep a window of decodes in flight and queue them in order
+        window = deque()
+        paths = self.images[::self.frame_stride]
+        for index, path in enumerate(paths):
+            window.append((index, path, pool.submit(self._decode_image, path)))
+            if len(window) >= 2 * self.decode_workers:
+                if not self._put_image(source_id, *window.popleft()):
+                    return
+        while window and self._put_image(source_id, *window.popleft()):
+            pass
+
+    def _put_image(self, source_id, index, path, future):
+        image, encoded = future.result()
+        if image is None:
+            self.logger.error(f"[OfflineReader] Failed to decode image: {path}")
+            return True
+        return self._put(Frame(image, source_id, index, encoded=encoded), {'file': self._relpath(path)})
+
+    def run(self):
+        try:
+            with ThreadPoolExecutor(max_workers=self.decode_workers, thread_name_prefix="offline-decode") as pool:
+                videos = [pool.submit(self._read_video, path) for path in self.videos]
+                if self.images:
+                    self._read_images(pool)
+                for future in videos:
+                    future.result()
+        except Exception as e:
+            self.logger.error(f"[OfflineReader] Decoding failed: {e}")
+        finally:
+            # End-of-input marker
+            while self.running:
+                try:
+                    self.frames.put(None, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+        self.logger.info(f"[OfflineReader] Finished: {self.decoded} frames decoded.")
+
+    def stop(self):
+        self.running = False
+        self.logger.debug("[OfflineReader] Stop signal received.")
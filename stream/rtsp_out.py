@@ -4,6 +4,8 @@ import logging
 import cv2
 import gi
 import numpy as np
+from cores.metrics import get_histogram
+from stream.frame import Frame
 
 gi.require_version('Gst', '1.0')
 gi.require_version('GstRtspServer', '1.0')
@@ -20,6 +22,8 @@ class StreamHandler:
         self.duration = int((1.0 / self.fps) * Gst.SECOND)
         self.number_frames = 0
         self.last_frame = None
+        # Capture -> on-air latency of every new frame this stream sends
+        self.latency = get_histogram(f"end_to_end.{stream_name}")
 
     def on_media_configure(self, factory, media):
         self.number_frames = 0
@@ -30,6 +34,9 @@ class StreamHandler:
     def on_need_data(self, src, length):
         try:
             frame = self.queue.get_nowait()
+            if isinstance(frame, Frame):
+                self.latency.record(frame.age())
+                frame = frame.image
             self.last_frame = frame
         except queue.Empty:
             frame = self.last_frame
@@ -53,7 +60,7 @@ class StreamHandler:
         src.emit('push-buffer', buf)
 
 class RTSPOUTPUTProducer(threading.Thread):
-    def __init__(self, config: dict, output_queues: dict): # รับตะกร้าแบบหลายใบ (Dict)
+    def __init__(self, config: dict, output_queues: dict): # รับตะกร้าแบบหลายใบ {source_id: {stream_name: slot}}
         super().__init__()
         self.config = config.get('output_stream', {})
         self.output_queues = output_queues
@@ -82,8 +89,13 @@ class RTSPOUTPUTProducer(threading.Thread):
         display_ip = "10.61.35.243" if self.ip_address == "0.0.0.0" else self.ip_address
         
         # วนลูปสร้างเส้นทาง (Mount Point) สำหรับทุกตะกร้าที่ระบุไว้ใน Config
-        for stream_name, mount_path in self.mounts.items():
-            if stream_name in self.output_queues:
+        # กล้องเดียวใช้ path เดิม (/od), หลายกล้องจะแยกเป็น /<source_id>/od
+        multi_source = len(self.output_queues) > 1
+        for source_id, source_queues in self.output_queues.items():
+            for stream_name, mount_path in self.mounts.items():
+                if stream_name not in source_queues:
+                    continue
+                
                 factory = GstRtspServer.RTSPMediaFactory()
                 
                 launch_string = (
@@ -97,13 +109,15 @@ class RTSPOUTPUTProducer(threading.Thread):
                 factory.set_shared(True)
                 
                 # ผูกตะกร้าเข้ากับ Handler ประจำตัว
-                q = self.output_queues[stream_name]
-                handler = StreamHandler(stream_name, q, self.fps, self.width, self.height)
+                q = source_queues[stream_name]
+                label = f"{source_id}/{stream_name}" if multi_source else stream_name
+                handler = StreamHandler(label, q, self.fps, self.width, self.height)
                 self.handlers.append(handler)
                 
+                full_mount = f"/{source_id}{mount_path}" if multi_source else mount_path
                 factory.connect("media-configure", handler.on_media_configure)
-                self.server.get_mount_points().add_factory(mount_path, factory)
-                self.logger.info(f"[{stream_name.upper()} Stream] LIVE at rtsp://{display_ip}:{self.port}{mount_path}")
+                self.server.get_mount_points().add_factory(full_mount, factory)
+                self.logger.info(f"[{label.upper()} Stream] LIVE at rtsp://{display_ip}:{self.port}{full_mount}")
         self.server.attach(None)
         self.loop = GLib.MainLoop()
         self.loop.run()
@@ -1,16 +1,25 @@
 import cv2
-import queue
 import time
+import numpy as np
 
 from stream.base_input import BaseInputProducer
+from stream.ingest import IngestScaler
 
 
 class RTSPRECEIVEProducer(BaseInputProducer):
-    def __init__(self, rtsp_url: str, frame_queue: queue.Queue):
+    def __init__(self, rtsp_url: str, frame_queue, source_id: str = 'default', config: dict = None):
         
-        super().__init__(source_url=rtsp_url, frame_queue=frame_queue)
+        super().__init__(source_url=rtsp_url, frame_queue=frame_queue, source_id=source_id)
+        
+        # Ingest resolution / fps cap (receive_img.ingest), applied inside GStreamer when possible
+        self.ingest = IngestScaler.from_config(config or {})
+        # True when the fallback backend is used and scaling/decimation must happen in Python
+        self.scale_in_python = False
         
         self.cap = None
+        # A shared-memory ring lets us decode straight into its slots instead of a fresh array
+        self.ring_acquire = getattr(frame_queue, 'acquire', None)
+        self.frame_shape = None
 
     def _connect(self):
         """Internal method to initialize the RTSP connection."""
@@ -20,24 +29,46 @@ class RTSPRECEIVEProducer(BaseInputProducer):
         # self.source_url (parent class uses)
         self.logger.info(f"[RTSPProducer] Attempting to connect to: {self.source_url}")
 
+        # videorate/videoscale run on the decoded YUV frames, so videoconvert only
+        # produces BGR pixels at the ingest size and rate
         gst_pipeline = (
             f'rtspsrc location={self.source_url} latency=0 ! '
             'rtph264depay ! h264parse ! avdec_h264 ! '
+            f'{self.ingest.gst_elements()}'
             'videoconvert ! appsink drop=true max-buffers=1'
         )
 
         self.cap = cv2.VideoCapture(gst_pipeline, cv2.CAP_GSTREAMER)
+        self.scale_in_python = False
 
         # Fallback to standard backend if GStreamer fails or is not available
         if not self.cap.isOpened():
             self.logger.warning("[RTSPProducer] GStreamer backend failed. Falling back to default backend.")
             self.cap = cv2.VideoCapture(self.source_url)
+            self.scale_in_python = self.ingest.scaling or self.ingest.fps > 0
 
         if self.cap.isOpened():
             self.logger.info("[RTSPProducer] Connect established successfully.")
         else:
             self.logger.error("[RTSPProducer] Connection failed. Please check the RTSP URL or Network.")
 
+    def _read_into_ring(self):
+        """Decode the next frame directly into a ring slot. Returns False when the read failed."""
+        height, width, channels = self.frame_shape
+        seq, view = self.ring_acquire(height, width, channels)
+        ret, frame = self.cap.read(image=view)
+        if not ret:
+            return False
+
+        if np.shares_memory(frame, view):
+            self.frame_queue.commit(seq, height, width, channels)
+        else:
+            # Resolution changed: OpenCV allocated a new array, fall back to a copy
+            self.frame_shape = frame.shape
+            self._publish(frame)
+        self.logger.debug("[RTSPProducer] Successfully grabbed a frame and put it in ring.")
+        return True
+
     def run(self):
         """Continuously read frames. Automatically reconnects and logs events."""
         self._connect()
@@ -49,21 +80,38 @@ class RTSPRECEIVEProducer(BaseInputProducer):
                 self._connect()
                 continue
         
-            ret, frame = self.cap.read()
+            if (self.ring_acquire is not None and self.frame_shape is not None and not self.scale_in_python
+                    and self.frame_queue.fits(*self.frame_shape)):
+                if self._read_into_ring():
+                    continue
+                self.frame_shape = None
+                self.logger.error("[RTSPProducer] Empty frame received. Triggering reconnection...")
+                self.cap.release()
+                continue
+        
+            if self.scale_in_python and self.ingest.fps > 0:
+                # No videorate: grab every packet to stay live, but only convert the frames we keep
+                if not self.cap.grab():
+                    self.logger.error("[RTSPProducer] Empty frame received. Triggering reconnection...")
+                    self.cap.release()
+                    continue
+                if not self.ingest.due():
+                    continue
+                ret, frame = self.cap.retrieve()
+            else:
+                ret, frame = self.cap.read()
             if not ret:
                 self.logger.error("[RTSPProducer] Empty frame received. Triggering reconnection...")
                 self.cap.release()
                 continue
             
-            if self.frame_queue.full():
-                try:
-                    # Drop the oldest frame to maintain real-time processing
-                    self.frame_queue.get_nowait() 
-                except queue.Empty:
-                    pass
-
-            self.frame_queue.put(frame)
-            self.logger.debug("[RTSPProducer] Successfully grabbed a frame and put it in queue.")
+            if self.scale_in_python:
+                frame = self.ingest.resize(frame)
+            self.frame_shape = frame.shape
+            
+            # Overwrites any unconsumed frame so processing stays real-time
+            self._publish(frame)
+            self.logger.debug("[RTSPProducer] Successfully grabbed a frame and published it.")
         
         if self.cap:
             self.cap.release()
@@ -1,13 +1,18 @@
 import os
+import numpy as np
 import torch
 from torch import nn
 from torchvision import transforms
 from torchvision.models import resnet152, ResNet152_Weights
-import torch.nn.functional as F
 from PIL import Image
 import logging
+import threading
 import cv2
 from tasks.prototypicalNetwork import PrototypicalNetworks
+from tasks.prototype_index import PrototypeIndex
+from tasks.embedding_cache import EmbeddingCache
+from tasks.support_watcher import SupportSetWatcher
+from tasks.cpu_acceleration import build_embedder, compare_embedders
 
 
 class ResNet152Backbone(nn.Module):
@@ -43,6 +48,17 @@ class ClassificationTask:
         self.dataset_root = self.config.get('dataset_root', '')
         self.img_size = self.config.get('img_size', 112)
         self.shots = self.config.get('shots', 20)
+        self.max_batch_size = max(1, int(self.config.get('max_batch_size', 32)))
+        self.prototypes_per_class = max(1, int(self.config.get('prototypes_per_class', 1)))
+        self.cache_path = self.config.get('cache_path', '')
+        self.watch_interval = float(self.config.get('watch_interval', 0))
+        # Node index the network was trained to compare at; None runs the full backbone through layer4
+        self.feature_node = self.config.get('feature_node', 67)
+        # CPU-only embedder variants: off | channels_last | int8 (validated against FP32 at startup)
+        self.cpu_acceleration = str(self.config.get('cpu_acceleration', 'off')).lower()
+        self.calibration_images = max(1, int(self.config.get('calibration_images', 64)))
+        self.min_agreement = float(self.config.get('min_agreement', 0.95))
+        self.accel_cache_dir = self.config.get('accel_cache_dir', 'cache/models')
         
         device_str = self.config.get('device', 'cpu')
         self.device = torch.device("cuda" if torch.cuda.is_available() and device_str == "cuda" else "cpu")
@@ -55,7 +71,13 @@ class ClassificationTask:
         ])
 
         self.model = None
-        self.prototypes = {}
+        self.embedder = None
+        self.variant = 'fp32'
+        self.index = None
+        self.embedding_cache = None
+        self.watcher = None
+        self._capped = {}
+        self._build_lock = threading.Lock()
 
         self._initialize_model()
 
@@ -82,77 +104,274 @@ class ClassificationTask:
 
             self.model.to(self.device)
             self.model.eval()
+            
+            if self.feature_node is not None:
+                # Pay the FX trace once at startup instead of per call
+                self.model.get_feature_extractor(self.feature_node)
+                self.logger.info(f"[ClassificationTask] Using truncated backbone at node {self.feature_node}.")
             self.logger.info("[ClassificationTask] Model loaded successfully.")
             
             # Build Prototypes
             if os.path.exists(self.dataset_root):
+                self._init_cpu_acceleration()
                 self._build_prototypes()
+                self._start_watcher()
             else:
                 self.logger.warning(f"[ClassificationTask] Dataset root not found: {self.dataset_root}. Prototypes cannot be built.")
                 
         except Exception as e:
             self.logger.error(f"[ClassificationTask] Failed to initialize model: {e}", exc_info=True)
 
-    def _build_prototypes(self):
-        self.logger.info(f"[ClassificationTask] Building Class Prototypes from: {self.dataset_root}")
+    def _scan_support_set(self):
+        """
+        Return {class_name: [(img_path, size, mtime_ns), ...]} with the `shots` newest images of each
+        class, so an example added to a full class replaces the oldest one instead of being ignored.
+        """
         class_names = sorted([d for d in os.listdir(self.dataset_root) if os.path.isdir(os.path.join(self.dataset_root, d))])
+        valid_extensions = ('.png', '.jpg', '.jpeg', '.bmp')
+        support_set = {}
+        capped = {}
 
         for class_name in class_names:
             class_dir = os.path.join(self.dataset_root, class_name)
-            images = []
-            valid_extensions = ('.png', '.jpg', '.jpeg', '.bmp')
-            
-            image_files = [f for f in os.listdir(class_dir) if f.lower().endswith(valid_extensions)][:self.shots]
-            
+            image_files = sorted(f for f in os.listdir(class_dir) if f.lower().endswith(valid_extensions))
+
+            entries = []
             for img_file in image_files:
                 img_path = os.path.join(class_dir, img_file)
                 try:
-                    img = Image.open(img_path).convert('RGB')
-                    img_tensor = self.transform(img)
-                    images.append(img_tensor)
+                    stat = os.stat(img_path)
+                except OSError:
+                    continue
+                entries.append((img_path, stat.st_size, stat.st_mtime_ns))
+
+            if len(entries) > self.shots:
+                capped[class_name] = len(entries) - self.shots
+                newest = sorted(entries, key=lambda e: -e[2])[:self.shots]
+                entries = sorted(newest)
+            support_set[class_name] = entries
+
+        # Also runs on every watcher poll: only report when the capped set changes
+        if capped != self._capped:
+            for class_name, dropped in capped.items():
+                self.logger.info(f"[ClassificationTask] '{class_name}' has {dropped} more image(s) than shots={self.shots}; "
+                                 f"using the {self.shots} newest.")
+            self._capped = capped
+
+        return support_set
+
+    def _init_embedding_cache(self):
+        if not self.cache_path:
+            return None
+
+        model_key = {
+            'checkpoint_sha256': EmbeddingCache.checkpoint_hash(self.model_path, self.cache_path),
+            'img_size': self.img_size,
+            'feature_node': self.feature_node,
+            'variant': self.variant,
+        }
+        cache = EmbeddingCache(self.cache_path, model_key)
+        cache.load()
+        return cache
+
+    def _support_sample(self, limit):
+        """Up to `limit` preprocessed support images, taken round-robin across classes. Returns (tensors, class ids)."""
+        per_class = [entries for entries in self._scan_support_set().values()]
+        tensors, labels = [], []
+        for rank in range(max((len(entries) for entries in per_class), default=0)):
+            for class_id, entries in enumerate(per_class):
+                if len(tensors) >= limit:
+                    return tensors, labels
+                if rank >= len(entries):
+                    continue
+                try:
+                    tensors.append(self.transform(Image.open(entries[rank][0]).convert('RGB')))
+                    labels.append(class_id)
                 except Exception as e:
-                    self.logger.debug(f"[ClassificationTask] Warning: Could not load {img_path}: {e}")
-            
-            if len(images) == 0:
+                    self.logger.debug(f"[ClassificationTask] Warning: Could not load {entries[rank][0]}: {e}")
+        return tensors, labels
+
+    def _init_cpu_acceleration(self):
+        """
+        Swap the FP32 backbone for a channels_last / INT8 TorchScript embedder when configured,
+        but only if its top-1 predictions on the support images agree with FP32 often enough.
+        """
+        if self.cpu_acceleration in ('off', 'none', 'fp32'):
+            return
+        if self.device.type != 'cpu':
+            self.logger.info(f"[ClassificationTask] cpu_acceleration '{self.cpu_acceleration}' ignored on {self.device}.")
+            return
+
+        try:
+            tensors, labels = self._support_sample(self.calibration_images)
+            if not tensors:
+                self.logger.warning("[ClassificationTask] No support images to calibrate/validate with. Staying on FP32.")
+                return
+            batches = [torch.stack(tensors[start:start + self.max_batch_size])
+                       for start in range(0, len(tensors), self.max_batch_size)]
+
+            digest = EmbeddingCache.checkpoint_hash(
+                self.model_path, self.cache_path or os.path.join(self.accel_cache_dir, os.path.basename(self.model_path)))
+            artifact_path = os.path.join(
+                self.accel_cache_dir,
+                f"cls-{digest[:16]}-{self.img_size}-n{self.feature_node}-{self.cpu_acceleration}.pt")
+            embedder = build_embedder(self.model, self.feature_node, self.cpu_acceleration, self.img_size,
+                                      batches, artifact_path, self.logger)
+
+            report = compare_embedders(
+                self._embed, lambda x: embedder(x.contiguous(memory_format=torch.channels_last)), batches, torch.tensor(labels))
+            self.logger.info(
+                f"[ClassificationTask] {self.cpu_acceleration} vs FP32 on {report['images']} support images: "
+                f"{report['speedup']:.2f}x faster, top-1 agreement {report['agreement']:.1%}, "
+                f"accuracy {report['accuracy']:.1%} (FP32 {report['fp32_accuracy']:.1%}), cosine {report['cosine']:.4f}")
+
+            if report['agreement'] < self.min_agreement:
+                self.logger.warning(f"[ClassificationTask] Agreement below {self.min_agreement:.0%}. Falling back to FP32.")
+                return
+            self.embedder = embedder
+            self.variant = self.cpu_acceleration
+        except Exception as e:
+            self.logger.error(f"[ClassificationTask] CPU acceleration failed ({e}). Falling back to FP32.", exc_info=True)
+
+    def _embed(self, input_tensor):
+        with torch.no_grad():
+            if self.embedder is not None:
+                return self.embedder(input_tensor.contiguous(memory_format=torch.channels_last))
+            if self.feature_node is None:
+                return self.model.backbone(input_tensor)
+            return self.model.embed(input_tensor, self.feature_node)
+
+    def _embed_files(self, img_paths):
+        """Embed support images in chunks of max_batch_size. Unreadable files map to None."""
+        embeddings = [None] * len(img_paths)
+
+        for start in range(0, len(img_paths), self.max_batch_size):
+            chunk = []
+            for i in range(start, min(start + self.max_batch_size, len(img_paths))):
+                try:
+                    img = Image.open(img_paths[i]).convert('RGB')
+                    chunk.append((i, self.transform(img)))
+                except Exception as e:
+                    self.logger.debug(f"[ClassificationTask] Warning: Could not load {img_paths[i]}: {e}")
+
+            if not chunk:
                 continue
 
-            input_tensor = torch.stack(images).to(self.device)
-            with torch.no_grad():
-                features = self.model.backbone(input_tensor) 
-            
-            prototype = features.mean(dim=0)
-            self.prototypes[class_name] = prototype
-            self.logger.info(f"[ClassificationTask] Prototype created for '{class_name}' using {len(images)} images.")
-            
-        self.logger.info(f"[ClassificationTask] Prototypes ready: {list(self.prototypes.keys())}")
+            input_tensor = torch.stack([t for _, t in chunk]).to(self.device)
+            features = self._embed(input_tensor).float().cpu().numpy()
+
+            for row, (i, _) in enumerate(chunk):
+                embeddings[i] = features[row]
+
+        return embeddings
+
+    def _start_watcher(self):
+        if self.watch_interval <= 0:
+            return
+        self.watcher = SupportSetWatcher(
+            scan_fn=self._scan_support_set,
+            on_change=self._build_prototypes,
+            interval=self.watch_interval
+        )
+        self.watcher.start()
+
+    def _build_prototypes(self):
+        # Also called from the watcher thread; inference keeps using the old index until the swap
+        with self._build_lock:
+            self._build_prototypes_locked()
+
+    def _build_prototypes_locked(self):
+        self.logger.info(f"[ClassificationTask] Building Class Prototypes from: {self.dataset_root}")
+        support_set = self._scan_support_set()
+
+        if self.embedding_cache is None:
+            self.embedding_cache = self._init_embedding_cache()
+        cache = self.embedding_cache
+
+        # Only images that are new or changed since the cache was written go through the backbone
+        cached = {}
+        missing = []
+        for entries in support_set.values():
+            for img_path, size, mtime_ns in entries:
+                embedding = cache.lookup(img_path, size, mtime_ns) if cache is not None else None
+                if embedding is None:
+                    missing.append((img_path, size, mtime_ns))
+                else:
+                    cached[img_path] = embedding
+
+        if missing:
+            self.logger.info(f"[ClassificationTask] Embedding {len(missing)} new/changed support images "
+                             f"({len(cached)} served from cache)...")
+            for (img_path, size, mtime_ns), embedding in zip(missing, self._embed_files([m[0] for m in missing])):
+                if embedding is None:
+                    continue
+                cached[img_path] = embedding
+                if cache is not None:
+                    cache.put(img_path, size, mtime_ns, embedding)
+
+        if cache is not None:
+            cache.retain(img_path for entries in support_set.values() for img_path, _, _ in entries)
+            cache.save()
+
+        features_by_class = {}
+        for class_name, entries in support_set.items():
+            rows = [cached[img_path] for img_path, _, _ in entries if img_path in cached]
+            if not rows:
+                continue
+            features_by_class[class_name] = torch.from_numpy(np.stack(rows)).to(self.device)
+            self.logger.info(f"[ClassificationTask] Support features ready for '{class_name}' using {len(rows)} images.")
+
+        index = PrototypeIndex.from_features(features_by_class, prototypes_per_class=self.prototypes_per_class)
+        
+        if index is not None:
+            # Single reference assignment: readers see either the old or the new index, never a mix
+            self.index = index
+            self.logger.info(f"[ClassificationTask] Prototypes ready: {index.class_names} "
+                             f"({index.prototypes.size(0)} prototypes, {self.prototypes_per_class} per class)")
+
+    def _preprocess(self, image_bgr):
+        image_rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
+        img_pil = Image.fromarray(image_rgb)
+        return self.transform(img_pil)
 
     def execute(self, image_bgr):
-     
-        if self.model is None or not self.prototypes or image_bgr is None or image_bgr.size == 0:
-            return None, 0.0
+        return self.execute_batch([image_bgr])[0]
+
+    def execute_batch(self, crops):
+        """
+        Classify every crop of a frame with one backbone forward pass per chunk.
+        Returns a list of (class, confidence) aligned with the input crops.
+        """
+        results = [(None, 0.0)] * len(crops)
+
+        index = self.index
+        if self.model is None or index is None:
+            return results
+
+        valid_idx = [i for i, crop in enumerate(crops) if crop is not None and crop.size > 0]
+        if not valid_idx:
+            return results
 
         try:
-           
-            image_rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
-            img_pil = Image.fromarray(image_rgb)
-            
-            input_tensor = self.transform(img_pil).unsqueeze(0).to(self.device)
+            # Chunk the crops so a crowded frame cannot blow up memory
+            for start in range(0, len(valid_idx), self.max_batch_size):
+                chunk_idx = valid_idx[start:start + self.max_batch_size]
+                input_tensor = torch.stack([self._preprocess(crops[i]) for i in chunk_idx]).to(self.device)
 
-            with torch.no_grad():
-                query_feature = self.model.backbone(input_tensor).squeeze(0)
+                query_features = self._embed(input_tensor)
 
-            distances = {name: torch.dist(query_feature, vec).item() for name, vec in self.prototypes.items()}
+                class_ids, confidences = index.search(query_features, k=1)
 
-            if not distances:
-                return None, 0.0
+                # Single host transfer for the whole chunk
+                for i, cls_id, conf in zip(chunk_idx, class_ids[:, 0].tolist(), confidences[:, 0].tolist()):
+                    results[i] = (index.class_names[cls_id], conf * 100)
+
+            return results
 
-            predicted_class = min(distances, key=distances.get)
-            
-            probs = F.softmax(torch.tensor([-d for d in distances.values()]), dim=0)
-            confidence = probs.max().item() * 100
-            
-            return predicted_class, confidence
-            
         except Exception as e:
             self.logger.error(f"[ClassificationTask] Inference error: {e}")
-            return None, 0.0
\ No newline at end of file
+            return [(None, 0.0)] * len(crops)
+
+    def stop(self):
+        if self.watcher is not None:
+            self.watcher.stop()
@@ -0,0 +1,133 @@
+import os
+import copy
+import time
+import logging
+import torch
+from torch import nn
+import torch.nn.functional as F
+
+from tasks.embedding_cache import atomic_write
+
+# classification.cpu_acceleration values
+MODES = ('off', 'channels_last', 'int8')
+
+
+class PooledEmbedder(nn.Module):
+    """Truncated backbone + global average pool as one traceable module (what ClassificationTask._embed computes)."""
+    def __init__(self, model, feature_node):
+        super().__init__()
+        self.feature_node = feature_node
+        body = model.backbone if feature_node is None else model.get_feature_extractor(feature_node)
+        self.body = copy.deepcopy(body).cpu().eval()
+
+    def forward(self, x):
+        if self.feature_node is None:
+            return self.body(x)
+        out = self.body(x)['maxpool1']
+        return F.adaptive_avg_pool2d(out, 1).flatten(1)
+
+
+def _quantized_engine():
+    engine = 'x86' if 'x86' in torch.backends.quantized.supported_engines else 'fbgemm'
+    torch.backends.quantized.engine = engine
+    return engine
+
+
+def build_embedder(model, feature_node, mode: str, img_size: int, calibration_batches=(),
+                   artifact_path: str = None, logger: logging.Logger = None):
+    """
+    CPU embedder as a frozen TorchScript module taking channels_last input.
+      channels_last: FP32, NHWC memory format (oneDNN's preferred conv layout), traced and frozen.
+      int8:          FX static post-training quantization calibrated on `calibration_batches`,
+                     then traced and frozen. (Dynamic quantization only covers Linear/LSTM layers,
+                     so it would leave every convolution of the ResNet in FP32.)
+    The artifact is loaded from / saved to `artifact_path` when given.
+    """
+    logger = logger or logging.getLogger("AIPipeline")
+    if mode == 'int8':
+        _quantized_engine()
+
+    if artifact_path and os.path.exists(artifact_path):
+        try:
+            module = torch.jit.load(artifact_path, map_location='cpu')
+            logger.info(f"[CPUAcceleration] Loaded cached {mode} embedder from {artifact_path}")
+            return module
+        except Exception as e:
+            logger.warning(f"[CPUAcceleration] Cached embedder unusable ({e}). Rebuilding...")
+
+    started = time.perf_counter()
+    float_model = PooledEmbedder(model, feature_node)
+    example = torch.randn(1, 3, img_size, img_size).contiguous(memory_format=torch.channels_last)
+
+    with torch.no_grad():
+        if mode == 'int8':
+            from torch.ao.quantization import get_default_qconfig_mapping
+            from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+            prepared = prepare_fx(float_model, get_default_qconfig_mapping(torch.backends.quantized.engine), (example,))
+            calibrated = 0
+            for batch in calibration_batches:
+                prepared(batch.contiguous(memory_format=torch.channels_last))
+                calibrated += batch.size(0)
+            if not calibrated:
+                raise ValueError("INT8 quantization needs calibration images")
+            module = convert_fx(prepared)
+            logger.info(f"[CPUAcceleration] Calibrated INT8 observers on {calibrated} support images.")
+        elif mode == 'channels_last':
+            module = float_model.to(memory_format=torch.channels_last)
+        else:
+            raise ValueError(f"Unknown cpu_acceleration mode '{mode}' (expected one of {MODES})")
+
+        scripted = torch.jit.freeze(torch.jit.trace(module, example).eval())
+        # First calls run the TorchScript profiling passes; pay them here
+        for _ in range(2):
+            scripted(example)
+
+    if artifact_path:
+        # Private temp file per writer: process-pool workers may build the same artifact at once
+        atomic_write(artifact_path, lambda f: torch.jit.save(scripted, f))
+
+    logger.info(f"[CPUAcceleration] Built {mode} embedder in {time.perf_counter() - started:.1f}s")
+    return scripted
+
+
+def _leave_one_out_predictions(features: torch.Tensor, labels: torch.Tensor):
+    """Nearest-prototype class of every sample, its own class prototype computed without it."""
+    num_classes = int(labels.max()) + 1
+    sums = torch.zeros(num_classes, features.size(1)).index_add_(0, labels, features)
+    counts = torch.bincount(labels, minlength=num_classes).float()
+
+    dists = torch.cdist(features, sums / counts.clamp(min=1)[:, None])
+    own_counts = (counts[labels] - 1)[:, None]
+    own_proto = (sums[labels] - features) / own_counts.clamp(min=1)
+    own_dist = (features - own_proto).norm(dim=1)
+    dists[torch.arange(len(labels)), labels] = torch.where(own_counts[:, 0] > 0, own_dist,
+                                                           torch.full_like(own_dist, float('inf')))
+    return dists.argmin(dim=1)
+
+
+def compare_embedders(reference_fn, candidate_fn, batches, labels: torch.Tensor):
+    """
+    Speed/accuracy of a candidate embedder against the FP32 reference on labelled images:
+    embedding cosine similarity, leave-one-out prototype accuracy of both, their top-1
+    agreement and the speedup.
+    """
+    timings = []
+    outputs = []
+    for embed_fn in (reference_fn, candidate_fn):
+        started = time.perf_counter()
+        with torch.no_grad():
+            outputs.append(torch.cat([embed_fn(batch).float().cpu() for batch in batches]))
+        timings.append(time.perf_counter() - started)
+
+    reference, candidate = outputs
+    ref_pred = _leave_one_out_predictions(reference, labels)
+    cand_pred = _leave_one_out_predictions(candidate, labels)
+    return {
+        'images': len(labels),
+        'cosine': float(F.cosine_similarity(reference, candidate).mean()),
+        'fp32_accuracy': float((ref_pred == labels).float().mean()),
+        'accuracy': float((cand_pred == labels).float().mean()),
+        'agreement': float((ref_pred == cand_pred).float().mean()),
+        'speedup': timings[0] / max(timings[1], 1e-9),
+    }
@@ -0,0 +1,87 @@
+import numpy as np
+
+
+class Detections:
+    """
+    Detector output as a struct of numpy arrays instead of an ultralytics Results object:
+    xyxy (N, 4) float32, conf (N,) float32, cls (N,) int64 and the model's names table.
+    Built from one device->host transfer; every operation below is vectorized and returns
+    a new Detections, so an instance can be shared between threads and frames.
+    """
+    __slots__ = ('xyxy', 'conf', 'cls', 'names')
+
+    def __init__(self, xyxy, conf, cls, names):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+        self.names = names
+
+    @classmethod
+    def from_data(cls, data, names):
+        """From an (N, 6) [x1, y1, x2, y2, conf, cls] array."""
+        data = np.asarray(data, dtype=np.float32).reshape(-1, 6)
+        return cls(data[:, :4], data[:, 4], data[:, 5].astype(np.int64), names)
+
+    @classmethod
+    def from_result(cls, result):
+        """From an ultralytics Results: boxes.data is copied to the host once for all boxes."""
+        boxes = result.boxes
+        data = boxes.data.cpu().numpy() if boxes is not None else np.zeros((0, 6), dtype=np.float32)
+        return cls.from_data(data, result.names)
+
+    @classmethod
+    def empty(cls, names):
+        return cls.from_data(np.zeros((0, 6), dtype=np.float32), names)
+
+    def __len__(self):
+        return len(self.cls)
+
+    # ------------------------------------------------------------------
+    # Labels
+    # ------------------------------------------------------------------
+    def class_id(self, label: str):
+        """Class id of a label name, or None when the model does not have it."""
+        items = self.names.items() if isinstance(self.names, dict) else enumerate(self.names)
+        for class_id, name in items:
+            if name == label:
+                return class_id
+        return None
+
+    def labels(self):
+        return [self.names[c] for c in self.cls.tolist()]
+
+    # ------------------------------------------------------------------
+    # Vectorized transforms
+    # ------------------------------------------------------------------
+    def filter(self, mask):
+        """Subset by boolean mask or index array."""
+        return Detections(self.xyxy[mask], self.conf[mask], self.cls[mask], self.names)
+
+    def clip(self, width: int, height: int):
+        """Boxes clipped to the image; boxes left without area are dropped."""
+        xyxy = self.xyxy.copy()
+        xyxy[:, [0, 2]] = np.clip(xyxy[:, [0, 2]], 0, width)
+        xyxy[:, [1, 3]] = np.clip(xyxy[:, [1, 3]], 0, height)
+        keep = (xyxy[:, 2] > xyxy[:, 0]) & (xyxy[:, 3] > xyxy[:, 1])
+        return Detections(xyxy[keep], self.conf[keep], self.cls[keep], self.names)
+
+    def with_label(self, label: str):
+        class_id = self.class_id(label)
+        if class_id is None:
+            return self.filter(np.zeros(len(self), dtype=bool))
+        return self.filter(self.cls == class_id)
+
+    def above(self, conf: float):
+        return self.filter(self.conf >= conf)
+
+    def by_label(self):
+        """{label: Detections} for every label present, each keeping the original order."""
+        return {self.names[c]: self.filter(self.cls == c) for c in np.unique(self.cls).tolist()}
+
+    def int_boxes(self):
+        """Boxes as an (N, 4) int array (pixel indices for cropping)."""
+        return self.xyxy.astype(np.int32)
+
+    def crops(self, image):
+        """Views into `image` for every box (clip first so no crop is empty)."""
+        return [image[y1:y2, x1:x2] for x1, y1, x2, y2 in self.int_boxes().tolist()]
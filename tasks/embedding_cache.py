@@ -0,0 +1,146 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import numpy as np
+
+
+def atomic_write(path: str, write):
+    """
+    Call write(f) on a private temp file beside `path` (binary mode), then move it into place.
+    Every writer gets its own temp file, so processes saving the same path at once never
+    interleave; the last complete file wins.
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}-", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class EmbeddingCache:
+    """
+    Persistent per-image embedding cache stored as a single .npz file.
+    The whole file is invalidated when the model key (checkpoint hash, img_size, ...) changes;
+    individual entries are invalidated when an image's size or mtime changes.
+    """
+    def __init__(self, cache_path: str, model_key: dict):
+        self.logger = logging.getLogger("AIPipeline")
+        self.cache_path = cache_path
+        self.model_key = model_key
+        self.entries = {}   # path -> (size, mtime_ns, embedding)
+        self.dirty = False
+
+    @staticmethod
+    def checkpoint_hash(model_path: str, cache_path: str = None):
+        """
+        SHA-256 of the checkpoint file. The digest is remembered next to the cache keyed on
+        the checkpoint's size/mtime, so an unchanged checkpoint is not re-read on every start.
+        """
+        stat = os.stat(model_path)
+        stamp = {'path': os.path.abspath(model_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        stamp_path = f"{cache_path}.ckpt.json" if cache_path else None
+
+        if stamp_path and os.path.exists(stamp_path):
+            try:
+                with open(stamp_path, 'r', encoding='utf-8') as f:
+                    saved = json.load(f)
+                if all(saved.get(k) == v for k, v in stamp.items()):
+                    return saved['sha256']
+            except (OSError, ValueError, KeyError):
+                pass
+
+        digest = hashlib.sha256()
+        with open(model_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        stamp['sha256'] = digest.hexdigest()
+
+        if stamp_path:
+            try:
+                payload = json.dumps(stamp).encode('utf-8')
+                atomic_write(stamp_path, lambda f: f.write(payload))
+            except OSError:
+                pass
+
+        return stamp['sha256']
+
+    def load(self):
+        if not os.path.exists(self.cache_path):
+            self.logger.info(f"[EmbeddingCache] No cache at {self.cache_path}. Starting empty.")
+            return
+
+        try:
+            with np.load(self.cache_path, allow_pickle=False) as data:
+                meta = json.loads(str(data['meta']))
+                if meta != self.model_key:
+                    self.logger.info("[EmbeddingCache] Model key changed. Discarding cached embeddings.")
+                    return
+
+                paths = data['paths'].tolist()
+                sizes = data['sizes'].tolist()
+                mtimes = data['mtimes'].tolist()
+                embeddings = data['embeddings']
+
+            self.entries = {
+                path: (size, mtime, embeddings[i])
+                for i, (path, size, mtime) in enumerate(zip(paths, sizes, mtimes))
+            }
+            self.logger.info(f"[EmbeddingCache] Loaded {len(self.entries)} cached embeddings from {self.cache_path}")
+
+        except Exception as e:
+            self.logger.warning(f"[EmbeddingCache] Failed to read {self.cache_path}, rebuilding: {e}")
+            self.entries = {}
+
+    def lookup(self, path: str, size: int, mtime_ns: int):
+        entry = self.entries.get(path)
+        if entry is None or entry[0] != size or entry[1] != mtime_ns:
+            return None
+        return entry[2]
+
+    def put(self, path: str, size: int, mtime_ns: int, embedding: np.ndarray):
+        self.entries[path] = (size, mtime_ns, np.asarray(embedding, dtype=np.float32))
+        self.dirty = True
+
+    def retain(self, paths):
+        """Drop entries for images that are no longer part of the support set."""
+        keep = set(paths)
+        stale = [p for p in self.entries if p not in keep]
+        for p in stale:
+            del self.entries[p]
+        if stale:
+            self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+
+        paths = list(self.entries.keys())
+        if paths:
+            embeddings = np.stack([self.entries[p][2] for p in paths])
+        else:
+            embeddings = np.zeros((0, 0), dtype=np.float32)
+
+        try:
+            # Atomic swap so a crash (or a concurrent writer) never leaves a half-written cache behind
+            atomic_write(self.cache_path, lambda f: np.savez(
+                f,
+                meta=np.array(json.dumps(self.model_key, sort_keys=True)),
+                paths=np.array(paths, dtype=str),
+                sizes=np.array([self.entries[p][0] for p in paths], dtype=np.int64),
+                mtimes=np.array([self.entries[p][1] for p in paths], dtype=np.int64),
+                embeddings=embeddings,
+            ))
+            self.dirty = False
+            self.logger.info(f"[EmbeddingCache] Saved {len(paths)} embeddings to {self.cache_path}")
+        except Exception as e:
+            self.logger.warning(f"[EmbeddingCache] Failed to save cache: {e}")
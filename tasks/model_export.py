@@ -0,0 +1,121 @@
+import os
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import importlib.util
+import numpy as np
+import torch
+
+from tasks.embedding_cache import EmbeddingCache
+
+# Exported artifact suffix per backend (ultralytics export format names)
+EXPORT_FORMATS = {'onnx': '.onnx', 'openvino': '_openvino_model'}
+# Runtime module each backend needs, in "auto" preference order
+_BACKEND_MODULES = (('openvino', 'openvino'), ('onnx', 'onnxruntime'))
+
+
+def resolve_backend(backend: str, weights_path: str):
+    """
+    'native' loads weights_path as-is (.pt, .engine, ...). 'auto' keeps that, except for a
+    TensorRT engine on a machine without CUDA, where it picks OpenVINO or ONNX Runtime
+    (whichever is installed) and exports from the .pt next to the engine.
+    """
+    if backend != 'auto':
+        return backend
+    if weights_path.endswith('.engine') and not torch.cuda.is_available():
+        for name, module in _BACKEND_MODULES:
+            if importlib.util.find_spec(module) is not None:
+                return name
+    return 'native'
+
+
+def supports_dynamic_batch(weights_path: str, backend: str):
+    """Our exports (dynamic=True) and .pt weights take any batch size; a native .engine/.onnx may be fixed at 1."""
+    return backend in EXPORT_FORMATS or weights_path.endswith('.pt')
+
+
+def source_weights(weights_path: str):
+    """PyTorch weights to export from: the path itself, or a .pt with the same name beside it."""
+    root, ext = os.path.splitext(weights_path)
+    if ext == '.pt':
+        return weights_path
+    if os.path.exists(root + '.pt'):
+        return root + '.pt'
+    raise FileNotFoundError(f"Exporting needs the PyTorch weights: {root}.pt not found")
+
+
+def exported_model_path(weights_path: str, backend: str, img_size: int, cache_dir: str = 'cache/models',
+                        logger: logging.Logger = None):
+    """
+    Path of the exported model for (weights SHA-256, img_size, backend), exporting it on a miss.
+    The export runs on a private copy of the weights and is moved into the cache atomically,
+    so several processes starting at once never see a half-written model.
+    """
+    logger = logger or logging.getLogger("AIPipeline")
+    source = source_weights(weights_path)
+    stem = os.path.splitext(os.path.basename(source))[0]
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # The hash stamp is keyed on the full source path: several models are typically all named best.pt
+    path_key = hashlib.sha1(os.path.abspath(source).encode('utf-8')).hexdigest()[:12]
+    digest = EmbeddingCache.checkpoint_hash(source, os.path.join(cache_dir, f"{stem}-{path_key}"))
+    target = os.path.join(cache_dir, f"{stem}-{digest[:16]}-{img_size}{EXPORT_FORMATS[backend]}")
+    if os.path.exists(target):
+        logger.info(f"[ModelExport] Using cached {backend} model {target}")
+        return target
+
+    logger.info(f"[ModelExport] Exporting {source} to {backend} (imgsz {img_size})...")
+    from ultralytics import YOLO
+    work_dir = tempfile.mkdtemp(prefix=f".{stem}-", dir=cache_dir)
+    try:
+        work_weights = os.path.join(work_dir, os.path.basename(source))
+        shutil.copy2(source, work_weights)
+        # dynamic axes so batched predict (cameras, tiles, crops) works with any batch size
+        exported = YOLO(work_weights).export(format=backend, imgsz=img_size, dynamic=True)
+        try:
+            os.replace(exported, target)
+        except OSError:
+            if not os.path.exists(target):   # otherwise another process finished first
+                raise
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    logger.info(f"[ModelExport] Cached {backend} model at {target}")
+    return target
+
+
+def warm_up(model, img_size: int, batch_size: int = 1):
+    """Run dummy frames through the model so the first real frame does not pay for lazy init. Returns seconds."""
+    dummy = np.zeros((img_size, img_size, 3), dtype=np.uint8)
+    started = time.perf_counter()
+    model.predict(source=dummy, imgsz=img_size, verbose=False)
+    if batch_size > 1:
+        model.predict(source=[dummy] * batch_size, imgsz=img_size, verbose=False)
+    return time.perf_counter() - started
+
+
+def load_yolo(weights_path: str, backend: str = 'native', img_size: int = 640, cache_dir: str = 'cache/models',
+              warmup: bool = True, batch_size: int = 1, logger: logging.Logger = None):
+    """YOLO model on the requested backend, exported/cached as needed and warmed up. Returns (model, backend)."""
+    logger = logger or logging.getLogger("AIPipeline")
+    backend = resolve_backend(backend, weights_path)
+    # Deferred so importing the task modules does not pull in ultralytics
+    from ultralytics import YOLO
+
+    if backend in EXPORT_FORMATS:
+        model = YOLO(exported_model_path(weights_path, backend, img_size, cache_dir, logger), task='detect')
+    elif backend == 'native':
+        model = YOLO(weights_path)
+    else:
+        raise ValueError(f"Unknown YOLO backend '{backend}' (expected native, auto, {', '.join(EXPORT_FORMATS)})")
+
+    if warmup:
+        try:
+            elapsed = warm_up(model, img_size, batch_size if supports_dynamic_batch(weights_path, backend) else 1)
+            logger.info(f"[ModelExport] Warm-up of {os.path.basename(weights_path)} ({backend}) took {elapsed * 1000:.0f}ms")
+        except Exception as e:
+            # Only costs first-frame latency; never lose the model over it
+            logger.warning(f"[ModelExport] Warm-up of {os.path.basename(weights_path)} ({backend}) failed: {e}")
+    return model, backend
@@ -0,0 +1,89 @@
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Cheap scene-change test run before YOLO for one camera.
+    Each frame is shrunk to a small grayscale image and compared with a running-average
+    background; detection is only needed when enough pixels changed, when the frame size
+    changed, or when `refresh_interval` frames went by without a full inference.
+    """
+    def __init__(self, width: int = 160, threshold: float = 0.01, pixel_delta: int = 25,
+                 alpha: float = 0.05, refresh_interval: int = 30):
+        self.width = width
+        self.threshold = threshold          # fraction of changed pixels that counts as motion
+        self.pixel_delta = pixel_delta      # per-pixel gray level difference that counts as changed
+        self.alpha = alpha                  # background learning rate
+        self.refresh_interval = refresh_interval
+
+        self._background = None
+        self._shape = None
+        self._since_run = 0
+
+        self.frames = 0
+        self.gated = 0
+        self.forced = 0
+        self.last_change = 0.0
+
+    @classmethod
+    def from_config(cls, config: dict):
+        gate_cfg = config.get('motion_gate', {})
+        if not gate_cfg.get('enabled', False):
+            return None
+        return cls(
+            width=int(gate_cfg.get('width', 160)),
+            threshold=float(gate_cfg.get('threshold', 0.01)),
+            pixel_delta=int(gate_cfg.get('pixel_delta', 25)),
+            alpha=float(gate_cfg.get('alpha', 0.05)),
+            refresh_interval=int(gate_cfg.get('refresh_interval', 30)),
+        )
+
+    def _small_gray(self, image):
+        h, w = image.shape[:2]
+        height = max(1, int(round(h * self.width / w)))
+        # Shrink first so the color conversion and blur only touch a few thousand pixels
+        small = cv2.resize(image, (self.width, height), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def needs_detection(self, image):
+        """True when YOLO has to run on this frame; False when the previous result can be reused."""
+        self.frames += 1
+        gray = self._small_gray(image)
+
+        if self._background is None or image.shape[:2] != self._shape:
+            self._background = gray.astype(np.float32)
+            self._shape = image.shape[:2]
+            self._since_run = 0
+            self.last_change = 1.0
+            return True
+
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self._background))
+        self.last_change = float(np.count_nonzero(diff > self.pixel_delta)) / diff.size
+        cv2.accumulateWeighted(gray, self._background, self.alpha)
+
+        if self.last_change >= self.threshold:
+            self._since_run = 0
+            return True
+
+        self._since_run += 1
+        if self.refresh_interval and self._since_run >= self.refresh_interval:
+            self._since_run = 0
+            self.forced += 1
+            return True
+
+        self.gated += 1
+        return False
+
+    def reset(self):
+        """Force detection on the next frame (e.g. after the previous result was lost)."""
+        self._background = None
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'gated': self.gated,
+            'forced': self.forced,
+            'gated_rate': self.gated / self.frames if self.frames else 0.0,
+        }
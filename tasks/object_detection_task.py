@@ -1,6 +1,8 @@
 import logging
 import traceback 
-from ultralytics import YOLO
+from tasks.detections import Detections
+from tasks.model_export import load_yolo, supports_dynamic_batch
+from tasks.tiling import TiledDetector
 
 class YOLOTask:
     def __init__(self, config: dict):
@@ -9,10 +11,32 @@ class YOLOTask:
             self.config = config['object_detection']
             model_path = self.config['yolo_model']
             self.conf = self.config.get('confidence_threshold', 0.25) 
+            self.max_batch_size = max(1, int(self.config.get('max_batch_size', 8)))
+            self.img_size = int(self.config.get('img_size', 640))
             
             self.logger.info(f"[ObjectDetectionTask] Loading YOLO model from {model_path}...")
-            self.model = YOLO(model_path)
-            self.logger.info("[ObjectDetectionTask] YOLO model loaded successfully.")
+            # native = load the file as-is; onnx/openvino = exported CPU model cached by weights hash + img_size
+            self.model, self.backend = load_yolo(
+                model_path,
+                backend=self.config.get('backend', 'native'),
+                img_size=self.img_size,
+                cache_dir=self.config.get('export_cache_dir', 'cache/models'),
+                warmup=self.config.get('warmup', True),
+                batch_size=self.max_batch_size,
+                logger=self.logger,
+            )
+            self.logger.info(f"[ObjectDetectionTask] YOLO model loaded successfully ({self.backend} backend).")
+            
+            if self.max_batch_size > 1 and not supports_dynamic_batch(model_path, self.backend):
+                # A static TensorRT engine rejects any other batch shape: predict cameras/tiles one by one
+                self.logger.info(f"[ObjectDetectionTask] {model_path} may be fixed-batch. Predicting one frame per call.")
+                self.max_batch_size = 1
+            
+            # Sliced inference for small objects on high-resolution frames (object_detection.tiling)
+            self.tiler = TiledDetector.from_config(self.config, self._predict_tiles)
+            if self.tiler is not None:
+                self.logger.info(f"[ObjectDetectionTask] Tiled inference enabled "
+                                 f"(tile {self.tiler.tile_size}, overlap {self.tiler.overlap:.0%}).")
             
         except Exception as e:
            
@@ -21,11 +45,14 @@ class YOLOTask:
             raise 
 
     def execute(self, frame):
+        if self.tiler is not None:
+            return self.execute_batch([frame])[0]
         try:
             
             results = self.model.predict(
                 source=frame, 
                 conf=self.conf, 
+                imgsz=self.img_size,
                 verbose=False
             )
             
@@ -33,9 +60,53 @@ class YOLOTask:
                 self.logger.warning("[ObjectDetectionTask] No results returned from model.")
                 return None
                 
-            return results[0]
+            return Detections.from_result(results[0])
 
         except Exception as e:
             self.logger.error(f"[YOLOTask] Error during inference: {str(e)}")
             self.logger.debug(traceback.format_exc()) 
-            return None
\ No newline at end of file
+            return None
+
+    def _predict_tiles(self, tiles):
+        """Batched predict over tile crops; one (N, 6) [x1, y1, x2, y2, conf, cls] array per tile."""
+        arrays = []
+        for start in range(0, len(tiles), self.max_batch_size):
+            predictions = self.model.predict(
+                source=list(tiles[start:start + self.max_batch_size]),
+                conf=self.conf,
+                imgsz=self.tiler.tile_size,
+                verbose=False
+            )
+            arrays.extend(p.boxes.data.cpu().numpy() if p.boxes is not None else None for p in predictions)
+        return arrays
+
+    def _execute_tiled(self, frames, keys):
+        names = self.model.names
+        return [Detections.from_data(data, names) for data in self.tiler.detect(frames, keys)]
+
+    def execute_batch(self, frames, keys=None):
+        """
+        One predict call per chunk of frames (e.g. the latest frame of every camera).
+        Returns one Detections per input frame (None where inference failed).
+        `keys` (e.g. source ids) identify the camera of each frame for tiled inference state.
+        """
+        results = [None] * len(frames)
+        try:
+            if self.tiler is not None:
+                return self._execute_tiled(frames, keys)
+            
+            for start in range(0, len(frames), self.max_batch_size):
+                chunk = frames[start:start + self.max_batch_size]
+                predictions = self.model.predict(
+                    source=list(chunk), 
+                    conf=self.conf, 
+                    imgsz=self.img_size,
+                    verbose=False
+                )
+                results[start:start + len(predictions)] = [Detections.from_result(p) for p in predictions]
+            return results
+
+        except Exception as e:
+            self.logger.error(f"[YOLOTask] Error during batch inference: {str(e)}")
+            self.logger.debug(traceback.format_exc()) 
+            return results
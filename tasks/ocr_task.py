@@ -8,15 +8,9 @@ os.environ["LRU_CACHE_CAPACITY"] = "1"
 os.environ["TORCH_CPP_LOG_LEVEL"] = "ERROR"
 
 import torch
-try:
-    torch.backends.mkldnn.enabled = False 
-    torch.backends.nnpack.enabled = False
-except:
-    pass
-
-from torchvision.transforms.v2 import Resize, Compose, ToImage, ToDtype
-from doctr.models import recognition
-from ultralytics import YOLO  
+
+from tasks.model_export import load_yolo
+from tasks.detections import Detections
 import warnings
 warnings.filterwarnings("ignore")
 
@@ -31,7 +25,9 @@ class OCRTask:
         
         self.display_yolo_path = self.config.get('display_yolo_model', '')
         self.display_conf = self.config.get('display_confidence_threshold', 0.5)
+        self.display_img_size = int(self.config.get('display_img_size', 640))
         self.display_model = None
+        self.max_batch_size = max(1, int(self.config.get('max_batch_size', 16)))
         
         if self.config.get('device', 'auto') == 'auto':
             self.device = "cuda" if torch.cuda.is_available() else "cpu"
@@ -39,7 +35,7 @@ class OCRTask:
             self.device = self.config.get('device', 'cpu')
 
         self.model = None
-        self.transforms = None
+        self.input_size = None
         
         
         self._initialize_display_model()
@@ -50,8 +46,16 @@ class OCRTask:
         if self.display_yolo_path and os.path.exists(self.display_yolo_path):
             try:
                 self.logger.info(f"[OCRTask] Loading Display YOLO model from {self.display_yolo_path}...")
-                self.display_model = YOLO(self.display_yolo_path)
-                self.logger.info("[OCRTask] Display YOLO model loaded successfully.")
+                self.display_model, backend = load_yolo(
+                    self.display_yolo_path,
+                    backend=self.config.get('display_backend', 'native'),
+                    img_size=self.display_img_size,
+                    cache_dir=self.config.get('export_cache_dir', 'cache/models'),
+                    warmup=self.config.get('warmup', True),
+                    batch_size=self.max_batch_size,
+                    logger=self.logger,
+                )
+                self.logger.info(f"[OCRTask] Display YOLO model loaded successfully ({backend} backend).")
             except Exception as e:
                 self.logger.error(f"[OCRTask] Failed to initialize Display YOLO model: {e}")
         else:
@@ -79,6 +83,8 @@ class OCRTask:
         self.logger.info(f"[OCRTask] Model: {model_arch}, Input Size: {input_size}, Device: {self.device.upper()}")
 
         try:
+            # doctr is heavy to import; only pay for it when OCR is actually enabled
+            from doctr.models import recognition
             self.model = recognition.__dict__[model_arch](
                 pretrained=False, 
                 vocab=vocab, 
@@ -103,75 +109,79 @@ class OCRTask:
         self.model.to(self.device)
         self.model.eval()
 
-        self.transforms = Compose([
-            ToImage(),
-            ToDtype(torch.float32, scale=True), 
-            Resize(input_size, antialias=True),
-        ])
+        self.input_size = input_size
         
         self.logger.info("[OCRTask] Model loaded and ready for inference.")
 
+    def _select_displays(self, crops):
+        """Run the display detector once over all crops and return the display region of each."""
+        if self.display_model is None:
+            return list(crops)
+
+        selected = list(crops)
+        results = self.display_model.predict(source=list(crops), conf=self.display_conf,
+                                             imgsz=self.display_img_size, verbose=False)
+
+        for i, result in enumerate(results):
+            h, w = crops[i].shape[:2]
+            # Highest-confidence "display" box, clipped to the crop (ultralytics sorts by confidence)
+            displays = Detections.from_result(result).with_label("display").clip(w, h)
+            if len(displays):
+                x1, y1, x2, y2 = displays.int_boxes()[0].tolist()
+                display_crop = crops[i][y1:y2, x1:x2]
+                if display_crop.size > 0:
+                    selected[i] = display_crop
+
+        return selected
+
+    def _to_batch_tensor(self, images):
+        """Resize straight to the recognizer INPUT_SIZE and stack into one (B, 3, H, W) tensor."""
+        in_h, in_w = self.input_size
+        batch = np.stack([
+            cv2.cvtColor(cv2.resize(img, (in_w, in_h), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2RGB)
+            for img in images
+        ])
+        return torch.from_numpy(batch).to(self.device).permute(0, 3, 1, 2).float().div_(255.0)
+
     def execute(self, cropped_img):
-        if self.model is None or cropped_img is None or cropped_img.size == 0:
-            return None, 0.0
+        return self.execute_batch([cropped_img])[0]
 
-        try:
-            # ==========================================
-            #  # Crop display digital gauge
-            # ==========================================
-            final_img_for_ocr = cropped_img 
-            
-            if self.display_model is not None:
-                results = self.display_model.predict(source=cropped_img, conf=self.display_conf, verbose=False)
-                
-                if len(results) > 0 and len(results[0].boxes) > 0:
-                    
-                    for box in results[0].boxes:
-                        cls_id = int(box.cls[0].item())
-                        label = results[0].names[cls_id]
-                        
-                       
-                        if label == "display": 
-                            x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
-                            
-                            h, w = cropped_img.shape[:2]
-                            x1, y1 = max(0, x1), max(0, y1)
-                            x2, y2 = min(w, x2), min(h, y2)
-                            
-                            display_crop = cropped_img[y1:y2, x1:x2]
-                            # cv2.imwrite('output_image.png', display_crop)
-                            
-                            if display_crop.size > 0:
-                                final_img_for_ocr = display_crop
-                                
-                            
-                            break
-
-            # ==========================================
-            # DOCTR 
-            # ==========================================
-            with torch.no_grad():
-
-                target_width = 1536
-                (h, w) = final_img_for_ocr.shape[:2]
-                r = target_width / float(w)
-                dim = (target_width, int(h * r))
-
-                resized = cv2.resize(final_img_for_ocr, dim, interpolation=cv2.INTER_AREA)
-                # cv2.imwrite('resize_display.jpg',resized)
-                
-                img_rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
-                img_tensor = self.transforms(img_rgb).unsqueeze(0).to(self.device)
+    def execute_batch(self, crops):
+        """
+        Read every digital-gauge crop of a frame: one display-detector pass and one
+        recognizer pass per chunk of max_batch_size. Returns (text, conf) per crop.
+        """
+        results = [(None, 0.0)] * len(crops)
+
+        if self.model is None:
+            return results
 
-                output = self.model(img_tensor, target=None, return_preds=True)
+        valid_idx = [i for i, crop in enumerate(crops) if crop is not None and crop.size > 0]
+        if not valid_idx:
+            return results
+
+        try:
+            for start in range(0, len(valid_idx), self.max_batch_size):
+                chunk_idx = valid_idx[start:start + self.max_batch_size]
+
+                # ==========================================
+                #  # Crop display digital gauge
+                # ==========================================
+                displays = self._select_displays([crops[i] for i in chunk_idx])
+
+                # ==========================================
+                # DOCTR 
+                # ==========================================
+                with torch.no_grad():
+                    img_tensor = self._to_batch_tensor(displays)
+                    output = self.model(img_tensor, target=None, return_preds=True)
                 
-                if "preds" in output:
-                    pred_text, conf = output['preds'][0]
-                else:
-                    pred_text, conf = output[0]
+                preds = output['preds'] if "preds" in output else output
+                for i, (pred_text, conf) in zip(chunk_idx, preds):
+                    results[i] = (pred_text, conf)
 
-                return pred_text, conf
+            return results
                 
         except Exception as e:
             self.logger.error(f"[OCRTask] Inference error: {e}", exc_info=True)
-            return None, 0.0
\ No newline at end of file
+            return [(None, 0.0)] * len(crops)
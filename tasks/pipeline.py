@@ -0,0 +1,98 @@
+import threading
+import queue
+import logging
+import traceback
+
+
+class TaskBatch:
+    """Crops of one frame routed to a single secondary task, plus their results."""
+    __slots__ = ('crops', 'boxes', 'tracks', 'results', 'pending')
+
+    def __init__(self):
+        self.crops = []
+        self.boxes = []
+        self.tracks = []
+        self.results = []
+        self.pending = []   # indices that still need inference (others reuse a track result)
+
+    def add(self, crop, box, track, result=None, needs_run=True):
+        if needs_run:
+            self.pending.append(len(self.crops))
+        self.crops.append(crop)
+        self.boxes.append(box)
+        self.tracks.append(track)
+        self.results.append(result)
+
+
+class FrameJob:
+    """Everything one frame (a stream.frame.Frame envelope) carries between the detect, secondary and publish stages."""
+    __slots__ = ('seq', 'frame', 'detections', 'ocr', 'cls', 'analog_crops', 'error')
+
+    def __init__(self, seq, frame, detections):
+        self.seq = seq
+        self.frame = frame
+        self.detections = detections   # tasks.detections.Detections, clipped to the frame
+        self.ocr = TaskBatch()
+        self.cls = TaskBatch()
+        self.analog_crops = []
+        self.error = None               # offline mode: why this frame has no (complete) result
+
+
+class StageWorker(threading.Thread):
+    """
+    Generic pipeline stage: pulls jobs from `in_queue`, applies `fn` and hands the
+    returned job to `out_queue` (if any). Puts block on a full queue (back-pressure)
+    but wake up regularly so the worker can be stopped. A job lost to an exception or
+    to a stop while handing it on is passed to `on_drop(job)`.
+    """
+    def __init__(self, name: str, fn, in_queue: queue.Queue, out_queue: queue.Queue = None, on_drop=None):
+        super().__init__(name=name)
+        self.fn = fn
+        self.on_drop = on_drop
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.running = True
+        self.daemon = True
+        self.logger = logging.getLogger("AIPipeline")
+
+    def run(self):
+        while self.running:
+            try:
+                job = self.in_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            try:
+                result = self.fn(job)
+            except Exception as e:
+                self.logger.error(f"[{self.name}] Stage error: {e}")
+                self.logger.debug(traceback.format_exc())
+                self._drop(job)
+                continue
+
+            if result is not None and self.out_queue is not None:
+                if not put_blocking(self.out_queue, result, lambda: self.running):
+                    self._drop(result)
+
+        self.logger.debug(f"[{self.name}] Thread stopped cleanly.")
+
+    def _drop(self, job):
+        if self.on_drop is not None:
+            try:
+                self.on_drop(job)
+            except Exception as e:
+                self.logger.debug(f"[{self.name}] on_drop failed: {e}")
+
+    def stop(self):
+        self.running = False
+
+
+def put_blocking(q: queue.Queue, item, is_running):
+    """Block while the queue is full, but give up once `is_running()` turns False."""
+    while is_running():
+        try:
+            q.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
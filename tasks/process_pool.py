@@ -0,0 +1,230 @@
+import importlib
+import logging
+import multiprocessing as mp
+import queue
+import signal
+import threading
+from multiprocessing import shared_memory
+import numpy as np
+
+_ALIGN = 64
+
+
+def _aligned(nbytes: int):
+    return (nbytes + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _worker_main(task_path: str, config: dict, shm_name: str, threads: int, request_q, response_q):
+    """Entry point of a worker process: load the model once, then serve batches from shared memory."""
+    # Ctrl+C goes to the whole process group; the parent shuts workers down explicitly
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    from cores import setup_logger, configure_torch_backends
+    logger = setup_logger(config)
+    configure_torch_backends(config)
+
+    if threads > 0:
+        import torch
+        torch.set_num_threads(threads)
+
+    module_name, class_name = task_path.rsplit('.', 1)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    task = None
+
+    try:
+        task = getattr(importlib.import_module(module_name), class_name)(config)
+        response_q.put(('ready', True))
+    except Exception as e:
+        logger.error(f"[TaskWorker] Failed to load {class_name}: {e}", exc_info=True)
+        response_q.put(('ready', False))
+
+    try:
+        while True:
+            message = request_q.get()
+            if message is None:
+                break
+
+            request_id, layout = message
+            # Zero-copy views into the shared segment written by the parent
+            crops = [np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=offset) for offset, shape in layout]
+            try:
+                results = task.execute_batch(crops) if task is not None else [(None, 0.0)] * len(crops)
+            except Exception as e:
+                logger.error(f"[TaskWorker] {class_name} batch failed: {e}")
+                results = [(None, 0.0)] * len(crops)
+            del crops
+            response_q.put((request_id, results))
+    finally:
+        if task is not None and hasattr(task, 'stop'):
+            task.stop()
+        shm.close()
+
+
+class _WorkerHandle:
+    def __init__(self, ctx, task_path: str, config: dict, shm_bytes: int, threads: int, index: int):
+        self.shm = shared_memory.SharedMemory(create=True, size=shm_bytes)
+        self.request_q = ctx.Queue()
+        self.response_q = ctx.Queue()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(task_path, config, self.shm.name, threads, self.request_q, self.response_q),
+            name=f"{task_path.rsplit('.', 1)[1]}Worker-{index}",
+            daemon=True
+        )
+        self.process.start()
+        self.alive = True
+        self._request_id = 0
+        # Request that timed out: the worker may still be reading its crops from the segment
+        self.stale_request = None
+
+    def pack(self, crops, indices):
+        """Copy as many crops as fit into the shared segment. Returns (indices packed, layout)."""
+        offset = 0
+        packed, layout = [], []
+        for i in indices:
+            crop = crops[i]
+            if offset + crop.nbytes > self.shm.size:
+                break
+            view = np.ndarray(crop.shape, dtype=np.uint8, buffer=self.shm.buf, offset=offset)
+            view[...] = crop
+            packed.append(i)
+            layout.append((offset, crop.shape))
+            offset += _aligned(crop.nbytes)
+        return packed, layout
+
+    def send(self, layout):
+        self._request_id += 1
+        self.request_q.put((self._request_id, layout))
+        return self._request_id
+
+    def receive(self, request_id, timeout: float):
+        while True:
+            reply_id, payload = self.response_q.get(timeout=timeout)
+            if reply_id == request_id:
+                return payload
+
+    def idle(self):
+        """
+        False while the reply to a timed-out request is still outstanding; the shared segment
+        must not be overwritten until the worker is done with it. Drains that reply if it arrived.
+        """
+        if self.stale_request is None:
+            return True
+        try:
+            while True:
+                reply_id, _ = self.response_q.get_nowait()
+                if reply_id >= self.stale_request:
+                    self.stale_request = None
+                    return True
+        except queue.Empty:
+            if not self.process.is_alive():
+                self.alive = False
+            return False
+
+    def close(self):
+        try:
+            self.request_q.put(None)
+            self.process.join(timeout=5.0)
+            if self.process.is_alive():
+                self.process.terminate()
+        finally:
+            self.shm.close()
+            self.shm.unlink()
+
+
+class ProcessPoolTask:
+    """
+    Drop-in replacement for OCRTask/ClassificationTask that hosts N copies of the task in
+    worker processes (each loads its model once). Crops travel through a per-worker
+    shared-memory segment; only their offsets/shapes and the small results are pickled.
+    A batch is split across all live workers so it runs on several cores at once.
+    """
+    def __init__(self, task_path: str, config: dict, workers: int = 1, shm_bytes: int = 32 * 1024 * 1024,
+                 timeout: float = 30.0, threads_per_worker: int = 0, startup_timeout: float = 600.0):
+        self.logger = logging.getLogger("AIPipeline")
+        self.task_path = task_path
+        self.name = task_path.rsplit('.', 1)[1]
+        self.timeout = timeout
+        self._lock = threading.Lock()
+
+        ctx = mp.get_context('spawn')
+        self.logger.info(f"[ProcessPoolTask] Starting {workers} worker process(es) for {self.name}...")
+        self.workers = [
+            _WorkerHandle(ctx, task_path, config, shm_bytes, threads_per_worker, i)
+            for i in range(max(1, workers))
+        ]
+
+        for worker in self.workers:
+            try:
+                _, ok = worker.response_q.get(timeout=startup_timeout)
+                if not ok:
+                    self.logger.warning(f"[ProcessPoolTask] {worker.process.name} started without a model.")
+            except queue.Empty:
+                self.logger.error(f"[ProcessPoolTask] {worker.process.name} did not become ready in time.")
+                worker.alive = False
+
+        self.logger.info(f"[ProcessPoolTask] {self.name} pool ready "
+                         f"({sum(w.alive for w in self.workers)}/{len(self.workers)} workers).")
+
+    @classmethod
+    def from_config(cls, task_path: str, config: dict, workers_key: str):
+        pool_cfg = config.get('process_pool', {})
+        return cls(
+            task_path,
+            config,
+            workers=pool_cfg.get(workers_key, 1),
+            shm_bytes=int(pool_cfg.get('shm_bytes', 32 * 1024 * 1024)),
+            timeout=pool_cfg.get('timeout', 30.0),
+            threads_per_worker=int(pool_cfg.get('threads_per_worker', 0)),
+        )
+
+    def execute(self, cropped_img):
+        return self.execute_batch([cropped_img])[0]
+
+    def execute_batch(self, crops):
+        results = [(None, 0.0)] * len(crops)
+        pending = [i for i, crop in enumerate(crops) if crop is not None and crop.size > 0]
+
+        with self._lock:
+            while pending:
+                live = [w for w in self.workers if w.alive and w.idle()]
+                if not live:
+                    self.logger.error(f"[ProcessPoolTask] No live idle {self.name} workers.")
+                    break
+
+                # Spread the remaining crops evenly over the live workers
+                share = -(-len(pending) // len(live))
+                dispatched = []
+                for worker in live:
+                    if not pending:
+                        break
+                    packed, layout = worker.pack(crops, pending[:share])
+                    if not packed:
+                        continue
+                    pending = pending[len(packed):]
+                    dispatched.append((worker, worker.send(layout), packed))
+
+                if not dispatched:
+                    # The head crop does not fit into a shared segment at all
+                    self.logger.warning(f"[ProcessPoolTask] Crop of {crops[pending[0]].nbytes} bytes exceeds shm_bytes. Skipped.")
+                    pending = pending[1:]
+                    continue
+
+                for worker, request_id, packed in dispatched:
+                    try:
+                        for i, result in zip(packed, worker.receive(request_id, self.timeout)):
+                            results[i] = result
+                    except queue.Empty:
+                        self.logger.error(f"[ProcessPoolTask] {worker.process.name} timed out.")
+                        worker.alive = worker.process.is_alive()
+                        # Keep it out of rotation until its late reply has been drained
+                        worker.stale_request = request_id
+
+        return results
+
+    def stop(self):
+        for worker in self.workers:
+            try:
+                worker.close()
+            except Exception as e:
+                self.logger.debug(f"[ProcessPoolTask] Error while closing {worker.process.name}: {e}")
@@ -0,0 +1,87 @@
+import torch
+import torch.nn.functional as F
+
+
+class PrototypeIndex:
+    """
+    All class prototypes stored as one contiguous (P, D) matrix.
+    A class may own several prototypes (e.g. k-means centroids of its support set);
+    its distance to a query is the distance to its closest prototype.
+    """
+    def __init__(self, class_names, prototypes: torch.Tensor, labels: torch.Tensor):
+        self.class_names = list(class_names)
+        self.prototypes = prototypes.contiguous()
+        self.labels = labels.long().to(prototypes.device)
+        # Squared norms are cached so a query is a single matmul
+        self.sq_norms = (self.prototypes * self.prototypes).sum(dim=1)
+
+    @classmethod
+    def from_features(cls, features_by_class: dict, prototypes_per_class: int = 1, kmeans_iters: int = 20):
+        """Build the index from {class_name: (N, D) support features}."""
+        class_names = []
+        proto_list = []
+        label_list = []
+
+        for class_id, (class_name, features) in enumerate(features_by_class.items()):
+            if prototypes_per_class <= 1:
+                centroids = features.mean(dim=0, keepdim=True)
+            elif features.size(0) <= prototypes_per_class:
+                # Too few shots to cluster: every support image is its own prototype
+                centroids = features
+            else:
+                centroids = cls._kmeans(features, prototypes_per_class, kmeans_iters)
+
+            class_names.append(class_name)
+            proto_list.append(centroids)
+            label_list.append(torch.full((centroids.size(0),), class_id, dtype=torch.long))
+
+        if not proto_list:
+            return None
+
+        return cls(class_names, torch.cat(proto_list), torch.cat(label_list))
+
+    @staticmethod
+    def _kmeans(features: torch.Tensor, k: int, iters: int):
+        # Deterministic init: evenly spaced support samples
+        init_idx = torch.linspace(0, features.size(0) - 1, k).long()
+        centroids = features[init_idx].clone()
+
+        for _ in range(iters):
+            assign = torch.cdist(features, centroids).argmin(dim=1)
+            sums = torch.zeros_like(centroids).index_add_(0, assign, features)
+            counts = torch.bincount(assign, minlength=k).unsqueeze(1).to(features.dtype)
+            # Empty clusters keep their previous centroid
+            updated = torch.where(counts > 0, sums / counts.clamp(min=1), centroids)
+            if torch.allclose(updated, centroids):
+                break
+            centroids = updated
+
+        return centroids
+
+    @property
+    def num_classes(self):
+        return len(self.class_names)
+
+    def class_distances(self, queries: torch.Tensor):
+        """(B, D) queries -> (B, C) Euclidean distance to the nearest prototype of each class."""
+        queries = queries.to(self.prototypes.device, self.prototypes.dtype)
+        q_norms = (queries * queries).sum(dim=1, keepdim=True)
+        sq_dists = torch.addmm(q_norms + self.sq_norms, queries, self.prototypes.t(), alpha=-2.0)
+        dists = sq_dists.clamp_(min=0).sqrt_()
+
+        if self.labels.numel() == self.num_classes:
+            # One prototype per class: columns are already in class order
+            return dists
+
+        per_class = dists.new_full((dists.size(0), self.num_classes), float('inf'))
+        return per_class.scatter_reduce_(1, self.labels.expand_as(dists), dists, reduce='amin')
+
+    def search(self, queries: torch.Tensor, k: int = 1):
+        """
+        Answer a batch of queries at once.
+        Returns (class_ids, confidences) tensors of shape (B, k), confidences in [0, 1].
+        """
+        dists = self.class_distances(queries)
+        probs = F.softmax(-dists, dim=1)
+        confidences, class_ids = torch.topk(probs, k=min(k, self.num_classes), dim=1)
+        return class_ids, confidences
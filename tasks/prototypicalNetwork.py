@@ -1,6 +1,7 @@
 from torchvision import transforms
 from torch import nn, optim
 import torch
+import torch.nn.functional as F
 from torchvision.models.feature_extraction import create_feature_extractor
 from torchvision.models.feature_extraction import get_graph_node_names
 
@@ -9,21 +10,31 @@ class PrototypicalNetworks(nn.Module):
     def __init__(self,backbone:nn.Module):
         super(PrototypicalNetworks, self).__init__()
         self.backbone=backbone
+        # Plain dict (not a submodule) so the cached extractors never show up in state_dict
+        self._extractors={}
 
-    def calculate(self,support_images:torch.Tensor,support_labels:torch.Tensor,query_images: torch.Tensor,num,numker):
-        global_avg_pool = nn.AdaptiveAvgPool2d((1))
-        train_nodes, eval_nodes = get_graph_node_names(self.backbone)
-        return_nodes2 = {
-            str(train_nodes[num]): "maxpool1"
-        }
-        f2 = create_feature_extractor(self.backbone, return_nodes=return_nodes2)
-        out2 = f2(support_images)
-        out2_pooled = global_avg_pool(out2['maxpool1'])
-        z_support  = out2_pooled.view(out2_pooled.size(0), -1)
+    def get_feature_extractor(self,num):
+        """Backbone truncated at train_nodes[num]. FX-traced once per node and cached."""
+        if num not in self._extractors:
+            train_nodes, eval_nodes = get_graph_node_names(self.backbone)
+            return_nodes2 = {
+                str(train_nodes[num]): "maxpool1"
+            }
+            self._extractors[num] = create_feature_extractor(self.backbone, return_nodes=return_nodes2)
+        f2 = self._extractors[num]
+        # The extractor is not a registered child, so follow train()/eval() of this module by hand
+        if f2.training != self.training:
+            f2.train(self.training)
+        return f2
+
+    def embed(self,images:torch.Tensor,num=67):
+        """Globally pooled features at train_nodes[num], shape (N, C)."""
+        out = self.get_feature_extractor(num)(images)['maxpool1']
+        return F.adaptive_avg_pool2d(out, 1).flatten(1)
 
-        out3 = f2(query_images)
-        out3_pooled = global_avg_pool(out3['maxpool1'])
-        z_query  = out3_pooled.view(out3_pooled.size(0), -1)
+    def calculate(self,support_images:torch.Tensor,support_labels:torch.Tensor,query_images: torch.Tensor,num,numker):
+        z_support = self.embed(support_images,num)
+        z_query = self.embed(query_images,num)
         n_way=len(torch.unique(support_labels))
 
         z_proto = torch.cat(
@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+
+def crop_signature(crop, size: int = 16):
+    """size x size area-averaged grayscale thumbnail of a crop (float32, 0-255)."""
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    return cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+class CropResultCache:
+    """
+    LRU/TTL cache of secondary-task results keyed on a crop's (grid-quantized) location.
+    An entry is only reused when no cell of the crop's downscaled grayscale signature differs
+    by more than `threshold` (0-255 scale) from the one stored with it. The max, not the mean:
+    one changed digit only touches a few of the cells and would vanish in an average.
+    """
+    def __init__(self, name: str, max_entries: int = 512, ttl: float = 10.0, threshold: float = 12.0,
+                 grid: int = 16, signature_size: int = 16):
+        self.name = name
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = float(ttl)
+        self.threshold = float(threshold)
+        self.grid = max(1, int(grid))
+        self.signature_size = int(signature_size)
+
+        self._entries = OrderedDict()   # key -> (signature, result, stored_at)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_config(cls, name: str, config: dict):
+        cache_cfg = config.get('result_cache', {})
+        if not cache_cfg.get('enabled', False):
+            return None
+        return cls(
+            name,
+            max_entries=cache_cfg.get('max_entries', 512),
+            ttl=cache_cfg.get('ttl', 10.0),
+            # Per-task override, e.g. a tighter threshold for OCR where a single digit matters
+            threshold=(cache_cfg.get('thresholds') or {}).get(name, cache_cfg.get('threshold', 12.0)),
+            grid=cache_cfg.get('grid', 16),
+            signature_size=cache_cfg.get('signature_size', 16),
+        )
+
+    def _signature(self, crop):
+        return crop_signature(crop, self.signature_size)
+
+    def _key(self, box, scope=None):
+        return (scope,) + tuple(int(v) // self.grid for v in box)
+
+    def get(self, crop, box, scope=None):
+        """
+        Returns (result, token). `result` is None on a miss; pass `token` to put()
+        together with the fresh result so the signature is not computed twice.
+        """
+        key = self._key(box, scope)
+        signature = self._signature(crop)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_sig, result, stored_at = entry
+                if now - stored_at > self.ttl:
+                    del self._entries[key]
+                    self.evictions += 1
+                elif float(np.max(np.abs(stored_sig - signature))) <= self.threshold:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return result, None
+            self.misses += 1
+
+        return None, (key, signature)
+
+    def put(self, token, result):
+        if token is None:
+            return
+        if result is None or not result[0]:
+            # Failed readings (None class, empty OCR text) must be retried, not served for the TTL
+            return
+        key, signature = token
+
+        with self._lock:
+            self._entries[key] = (signature, result, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'hit_rate': self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,63 @@
+import os
+import json
+import logging
+
+
+class JSONLResultWriter:
+    """
+    Offline mode sink: one JSON line per processed frame, one file per source
+    (<output_dir>/<source_id>.jsonl). `origins` maps (source_id, seq) to where the
+    frame came from (file, video position) and is consumed as frames are written.
+    """
+    def __init__(self, output_dir: str, origins: dict = None):
+        self.output_dir = output_dir
+        self.origins = origins if origins is not None else {}
+        self.files = {}
+        self.written = 0
+        self.logger = logging.getLogger("AIPipeline")
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _file(self, source_id: str):
+        if source_id not in self.files:
+            name = source_id.replace(os.sep, '__').replace('/', '__') + '.jsonl'
+            self.files[source_id] = open(os.path.join(self.output_dir, name), 'w', encoding='utf-8')
+        return self.files[source_id]
+
+    @staticmethod
+    def _box(box):
+        return [int(v) for v in box]
+
+    def to_record(self, job):
+        frame = job.frame
+        record = {'source': frame.source_id, 'frame': frame.seq}
+        record.update(self.origins.pop((frame.source_id, frame.seq), {}))
+
+        detections = job.detections
+        record['detections'] = [
+            {'label': label, 'conf': round(conf, 4), 'box': self._box(box)}
+            for label, conf, box in zip(detections.labels(), detections.conf.tolist(), detections.xyxy.tolist())
+        ] if detections is not None else []
+
+        record['ocr'] = [
+            {'box': self._box(box), 'text': result[0], 'conf': round(float(result[1]), 4)}
+            for box, result in zip(job.ocr.boxes, job.ocr.results) if result is not None
+        ]
+        record['classification'] = [
+            {'box': self._box(box), 'class': result[0], 'conf': round(float(result[1]), 2)}
+            for box, result in zip(job.cls.boxes, job.cls.results) if result is not None
+        ]
+        if job.error is not None:
+            record['error'] = job.error
+        return record
+
+    def write(self, job):
+        if job is None:
+            return
+        handle = self._file(job.frame.source_id)
+        handle.write(json.dumps(self.to_record(job), ensure_ascii=False) + '\n')
+        self.written += 1
+
+    def close(self):
+        for handle in self.files.values():
+            handle.close()
+        self.logger.info(f"[ResultWriter] {self.written} frame results written to {self.output_dir}")
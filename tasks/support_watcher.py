@@ -0,0 +1,59 @@
+import threading
+import time
+import logging
+
+
+class SupportSetWatcher(threading.Thread):
+    """
+    Polls a directory snapshot (paths, sizes, mtimes) and calls `on_change` in this
+    background thread whenever the snapshot differs from the previous one.
+    """
+    def __init__(self, scan_fn, on_change, interval: float = 5.0):
+        super().__init__()
+        self.scan_fn = scan_fn
+        self.on_change = on_change
+        self.interval = interval
+        self.running = True
+        self.daemon = True
+        self.logger = logging.getLogger("AIPipeline")
+        self._stop_event = threading.Event()
+        self._last_snapshot = None
+
+    def _snapshot(self):
+        try:
+            return self.scan_fn()
+        except OSError as e:
+            self.logger.warning(f"[SupportSetWatcher] Failed to scan support set: {e}")
+            return None
+
+    def run(self):
+        self._last_snapshot = self._snapshot()
+        self.logger.info(f"[SupportSetWatcher] Watching support set every {self.interval:.1f}s.")
+
+        while self.running:
+            if self._stop_event.wait(self.interval):
+                break
+
+            snapshot = self._snapshot()
+            if snapshot is None or snapshot == self._last_snapshot:
+                continue
+
+            # Let in-flight copies settle before reading the new files
+            time.sleep(min(1.0, self.interval))
+            settled = self._snapshot()
+            if settled != snapshot:
+                continue
+
+            self.logger.info("[SupportSetWatcher] Support set changed. Updating prototypes...")
+            try:
+                self.on_change()
+                self._last_snapshot = settled
+            except Exception as e:
+                self.logger.error(f"[SupportSetWatcher] Prototype update failed: {e}", exc_info=True)
+
+        self.logger.info("[SupportSetWatcher] Thread stopped cleanly.")
+
+    def stop(self):
+        self.running = False
+        self._stop_event.set()
+        self.logger.debug("[SupportSetWatcher] Stop signal received.")
@@ -4,129 +4,657 @@ import time
 import logging
 import cv2
 import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
 from cores.visualizer import Visualizer
+from cores.metrics import get_histogram, all_histograms
+from cores.torch_backends import configure_torch_backends
 
-from tasks.object_detection_task import YOLOTask
-from tasks.ocr_task import OCRTask
-from tasks.classification_task import ClassificationTask
+from tasks.result_cache import CropResultCache
+from tasks.tracker import IoUTracker
+from tasks.motion_gate import MotionGate
+from tasks.pipeline import FrameJob, StageWorker, put_blocking
+from tasks.process_pool import ProcessPoolTask
+from stream.latest_slot import wait_any
 import numpy as np
 # from tasks.analog_task import AnalogTask
 
 
 class TaskManager(threading.Thread):
-    def __init__(self, config: dict, frame_queue: queue.Queue, output_queues: dict):
+    def __init__(self, config: dict, frame_queues: dict, output_queues: dict):
+        """
+        frame_queues:  {source_id: frame hand-off}            (one per camera)
+        output_queues: {source_id: {stream_name: hand-off}}   (views are kept separate per camera)
+        """
         super().__init__()
         self.config = config
-        self.frame_queue = frame_queue
+        self.frame_queues = frame_queues
         self.output_queues = output_queues
         self.running = True
         
         self.logger = logging.getLogger("AIPipeline")
 
-        self.logger.info("[TaskManager] Initializing AI Models...")
-        self.yolo = YOLOTask(config)
-        self.ocr_task = OCRTask(config)
-        self.cls_task = ClassificationTask(config)
+        # Models load concurrently in the background (see _start_loading); each attribute stays None
+        # until its model is ready, so ingest and output streams run from the first second
+        self.yolo = None
+        self.ocr_task = None
+        self.cls_task = None
+        self._created = time.monotonic()
+        self._loader = None
+        self._load_futures = []
+        # Makes "still running? then publish the task" in _load atomic with stop()
+        self._tasks_lock = threading.Lock()
         
+        # Skip re-inference on crops that have not changed since the last frame
+        self.ocr_cache = CropResultCache.from_config('ocr', config)
+        self.cls_cache = CropResultCache.from_config('classification', config)
+        self.stats_interval = config.get('result_cache', {}).get('stats_interval', 30.0)
+        self._last_stats = time.monotonic()
+        
+        # Secondary tasks run once per track and are refreshed every N frames or on movement.
+        # Each camera gets its own tracker since track IDs only make sense within one view.
+        self.trackers = {source_id: IoUTracker.from_config(config) for source_id in frame_queues}
+        
+        # Skip YOLO on frames where the scene did not change and reuse that camera's last detections
+        self.gate_enabled = config.get('motion_gate', {}).get('enabled', False)
+        self.gates = {}
+        self._last_detections = {}
+        
+        self.offline = False
+        self.offline_batch_size = (int(config.get('offline', {}).get('batch_size', 0))
+                                   or max(1, int(config.get('object_detection', {}).get('max_batch_size', 8))))
         
         self.visualizer = Visualizer(config)
+        
+        # Staged pipeline: detect (this thread) -> secondary inference -> render/publish
+        pipeline_cfg = config.get('pipeline', {})
+        self.pipelined = pipeline_cfg.get('enabled', False)
+        self.stage_queue_size = max(1, int(pipeline_cfg.get('queue_size', 2)))
+        self.secondary_workers = max(1, int(pipeline_cfg.get('secondary_workers', 1)))
+        self.render_workers = max(1, int(pipeline_cfg.get('render_workers', 1)))
+        self.workers = []
+        
+        # Each model is used by one worker at a time; OCR of frame N can overlap classification of frame N+1
+        self._ocr_lock = threading.Lock()
+        self._cls_lock = threading.Lock()
+        self._publish_lock = threading.Lock()
+        self._seq = 0
+        self._last_published_seq = {}
+        
+        # Per-stage deadlines: frames older than max_age (seconds since capture) are dropped before the stage runs
+        latency_cfg = config.get('latency', {})
+        self.max_age = latency_cfg.get('max_age', {}) or {}
+        self.expired = {'detect': 0, 'secondary': 0, 'publish': 0}
+        self.pipeline_latency = get_histogram('capture_to_publish')
+        
+        self._start_loading()
+
+    # ------------------------------------------------------------------
+    # Model loading
+    # ------------------------------------------------------------------
+    def _create_yolo(self):
+        from tasks.object_detection_task import YOLOTask
+        return YOLOTask(self.config)
+
+    def _create_ocr(self):
+        # Optionally host the secondary models in worker processes to get around the GIL
+        if self.config.get('process_pool', {}).get('enabled', False):
+            return ProcessPoolTask.from_config('tasks.ocr_task.OCRTask', self.config, 'ocr_workers')
+        from tasks.ocr_task import OCRTask
+        return OCRTask(self.config)
+
+    def _create_classification(self):
+        if self.config.get('process_pool', {}).get('enabled', False):
+            return ProcessPoolTask.from_config('tasks.classification_task.ClassificationTask', self.config,
+                                               'classification_workers')
+        from tasks.classification_task import ClassificationTask
+        return ClassificationTask(self.config)
+
+    def _load(self, attr, name, factory):
+        """Loader-pool job: build one task (imports included) and switch it on."""
+        started = time.monotonic()
+        try:
+            task = factory()
+        except Exception as e:
+            self.logger.error(f"[TaskManager] {name} failed to load after {time.monotonic() - started:.1f}s: {e}")
+            self.logger.debug(traceback.format_exc())
+            return
+        
+        with self._tasks_lock:
+            keep = self.running
+            if keep:
+                setattr(self, attr, task)
+        if not keep:
+            # Shut down while loading: nobody will use (or stop) it otherwise
+            if hasattr(task, 'stop'):
+                task.stop()
+            return
+        self.logger.info(f"[TaskManager] {name} ready in {time.monotonic() - started:.1f}s "
+                         f"({time.monotonic() - self._created:.1f}s after start)")
 
-    def push_to_stream(self, stream_name, img):
-        if stream_name in self.output_queues and img is not None:
+    def _start_loading(self):
+        """Load every enabled model concurrently; heavy imports happen inside the loader threads."""
+        loaders = [
+            ('yolo', 'object_detection', 'Object detection', self._create_yolo),
+            ('ocr_task', 'ocr', 'OCR', self._create_ocr),
+            ('cls_task', 'classification', 'Classification', self._create_classification),
+        ]
+        enabled = [entry for entry in loaders if self.config.get(entry[1], {}).get('enabled', True)]
+        for _, section, name, _ in loaders:
+            if not self.config.get(section, {}).get('enabled', True):
+                self.logger.info(f"[TaskManager] {name} disabled ({section}.enabled = false).")
+        if not enabled:
+            return
+        
+        # Set before any loader runs: the loaders import and build models in parallel
+        configure_torch_backends(self.config)
+        workers = int(self.config.get('startup', {}).get('load_workers', 0)) or len(enabled)
+        self.logger.info(f"[TaskManager] Loading {len(enabled)} model(s) with {workers} loader thread(s)...")
+        self._loader = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ModelLoader")
+        self._load_futures = [self._loader.submit(self._load, attr, name, factory)
+                              for attr, _, name, factory in enabled]
+        self._loader.shutdown(wait=False)
+        
+        def report():
+            wait(self._load_futures)
+            if self.running:
+                self.logger.info(f"[TaskManager] Model loading finished in {time.monotonic() - self._created:.1f}s.")
+        threading.Thread(target=report, name="ModelLoaderReport", daemon=True).start()
+
+    def wait_ready(self):
+        """Block until every model load has finished (successfully or not)."""
+        wait(self._load_futures)
+
+    def _check_deadline(self, frame, stage):
+        """Stamp the frame for `stage`, or count and report it as expired."""
+        now = frame.stamp(stage)
+        if frame.expired(self.max_age.get(stage), now):
+            self.expired[stage] += 1
+            self.logger.debug(f"[TaskManager] Dropped frame {frame.source_id}#{frame.seq} at {stage} "
+                              f"(age {frame.age(now) * 1000:.0f}ms)")
+            return False
+        return True
+
+    def push_to_stream(self, stream_name, img, frame):
+        outputs = self.output_queues.get(frame.source_id, {})
+        if stream_name in outputs and img is not None:
             out_w = self.config.get('output_stream', {}).get('width', 640)
             out_h = self.config.get('output_stream', {}).get('height', 480)
             resized_img = cv2.resize(img, (out_w, out_h))
             
-            if not self.output_queues[stream_name].full():
-                self.output_queues[stream_name].put(resized_img)
+            # Freshest frame wins: replaces a frame the stream has not sent yet.
+            # The envelope keeps the capture timestamp so the output can measure end-to-end latency.
+            outputs[stream_name].publish(frame.with_image(resized_img))
+
+    def _execute_cached(self, task, cache, crops, boxes, scope):
+        """execute_batch() on the crops that miss the result cache; hits are served from it."""
+        if cache is None:
+            return task.execute_batch(crops)
+
+        results = [None] * len(crops)
+        miss_idx = []
+        tokens = {}
+        for i, (crop, box) in enumerate(zip(crops, boxes)):
+            cached, token = cache.get(crop, box, scope)
+            if cached is not None:
+                results[i] = cached
+            else:
+                miss_idx.append(i)
+                tokens[i] = token
+
+        if miss_idx:
+            fresh = task.execute_batch([crops[i] for i in miss_idx])
+            for i, result in zip(miss_idx, fresh):
+                results[i] = result
+                cache.put(tokens[i], result)
+
+        return results
+
+    def _run_batch(self, task, cache, lock, batch, source_id):
+        """Run the pending crops of a TaskBatch; the others already hold their track's last result."""
+        if not batch.pending:
+            return
+
+        with lock:
+            fresh = self._execute_cached(
+                task, cache,
+                [batch.crops[i] for i in batch.pending],
+                [batch.boxes[i] for i in batch.pending],
+                source_id
+            )
+
+        tracker = self.trackers.get(source_id)
+        for i, result in zip(batch.pending, fresh):
+            batch.results[i] = result
+            if batch.tracks[i] is not None:
+                tracker.set_result(batch.tracks[i], result)
+
+    def _log_stats(self):
+        now = time.monotonic()
+        if now - self._last_stats < self.stats_interval:
+            return
+        self._last_stats = now
+        
+        self.logger.info(f"[TaskManager] Expired frames: detect={self.expired['detect']} "
+                         f"secondary={self.expired['secondary']} publish={self.expired['publish']}")
+        for histogram in all_histograms():
+            self.logger.info(f"[TaskManager] Latency {histogram.name}: {histogram.summary()}")
+        
+        # Frames overwritten before they were consumed: input = not detected, output = not streamed
+        for source_id, frame_queue in self.frame_queues.items():
+            stats = frame_queue.stats()
+            outputs = self.output_queues.get(source_id, {})
+            out_dropped = ' '.join(f"{name}={slot.stats()['dropped']}" for name, slot in outputs.items())
+            self.logger.info(f"[TaskManager] Frames {source_id}: input published={stats['published']} "
+                             f"dropped={stats['dropped']} | output dropped: {out_dropped or '-'}")
+        
+        if self.yolo is not None and self.yolo.tiler is not None:
+            stats = self.yolo.tiler.stats()
+            self.logger.info(f"[TaskManager] Tiled detection: tiles_run={stats['tiles_run']} "
+                             f"tiles_reused={stats['tiles_reused']} reuse_rate={stats['reuse_rate']:.1%}")
+        
+        for source_id, gate in self.gates.items():
+            stats = gate.stats()
+            self.logger.info(f"[TaskManager] Motion gate {source_id}: frames={stats['frames']} "
+                             f"gated={stats['gated']} forced={stats['forced']} gated_rate={stats['gated_rate']:.1%}")
+        
+        for cache in (self.ocr_cache, self.cls_cache):
+            if cache is not None:
+                stats = cache.stats()
+                self.logger.info(f"[TaskManager] {cache.name} result cache: hits={stats['hits']} "
+                                 f"misses={stats['misses']} evictions={stats['evictions']} "
+                                 f"size={stats['size']} hit_rate={stats['hit_rate']:.1%}")
+
+    def _render_ocr(self, cropped_img, text):
+        ocr_display = cropped_img.copy()
+        return self.visualizer.draw_unicode_text(
+            ocr_display, 
+            text, 
+            position=(5, 5),     
+            font_size=25,        
+            color=(0, 0, 255)    
+        )
+
+    def _render_classification(self, cropped_img, pred_class, conf):
+        canvas_w, canvas_h = 640, 480
+        cls_display = np.zeros((canvas_h, canvas_w, 3), dtype=np.uint8)
+        
+        h, w = cropped_img.shape[:2]
+        scale = min((canvas_w - 40) / w, (canvas_h - 100) / h)
+        new_w, new_h = int(w * scale), int(h * scale)
+        resized_crop = cv2.resize(cropped_img, (new_w, new_h))
+        
+        x_offset = (canvas_w - new_w) // 2
+        y_offset = (canvas_h + 50 - new_h) // 2 
+        
+        cls_display[y_offset:y_offset+new_h, x_offset:x_offset+new_w] = resized_crop
+        
+        display_text = f"CLASS: {pred_class.upper()} ({conf:.1f}%)"
+        text_color = (0, 255, 0) if pred_class == "normal" else (0, 0, 255)
+        
+        # cv2.imwrite('debug_cls_stream.jpg', cls_display)
+        return self.visualizer.draw_unicode_text(
+            cls_display, 
+            display_text, 
+            position=(20, 20),  
+            font_size=36,
+            color=text_color
+        )
+
+    def _render_warming_up(self, image):
+        out_cfg = self.config.get('output_stream', {})
+        canvas = cv2.resize(image, (out_cfg.get('width', 640), out_cfg.get('height', 480)))
+        cv2.rectangle(canvas, (0, 0), (canvas.shape[1], 40), (0, 0, 0), -1)
+        if any(not future.done() for future in self._load_futures):
+            text = f"WARMING UP: loading models ({time.monotonic() - self._created:.0f}s)"
+        else:
+            text = "OBJECT DETECTION UNAVAILABLE"
+        cv2.putText(canvas, text,
+                    (10, 28), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2, cv2.LINE_AA)
+        return canvas
+
+    def _gather_frames(self, timeout):
+        """Latest unconsumed frame of every camera that has one; waits up to `timeout` for the first."""
+        if not wait_any(self.frame_queues.values(), timeout):
+            raise queue.Empty
+        
+        frames = []
+        for frame_queue in self.frame_queues.values():
+            try:
+                frames.append(frame_queue.get_nowait())
+            except queue.Empty:
+                continue
+        return frames
+
+    def _detect(self, frames):
+        """Stage 1: one batched YOLO call over all cameras, then per-camera tracking and routing."""
+        frames = [frame for frame in frames if self._check_deadline(frame, 'detect')]
+        if not frames:
+            return []
+        
+        if self.yolo is None:
+            # Detector still loading (or disabled): keep the od view alive with the raw frames
+            for frame in frames:
+                self.push_to_stream('od', self._render_warming_up(frame.image), frame)
+            return []
+        
+        detection_results = self._gated_detections(frames)
+        if self.offline:
+            # Never drop a frame offline: retry failures one by one, then report what still failed
+            for i, detections in enumerate(detection_results):
+                if detections is None:
+                    detection_results[i] = self.yolo.execute_batch([frames[i].image], keys=[frames[i].source_id])[0]
+            return [
+                self._route_detections(frame, detections) if detections is not None
+                else self._failed_job(frame, "detection failed")
+                for frame, detections in zip(frames, detection_results)
+            ]
+        return [
+            self._route_detections(frame, detections)
+            for frame, detections in zip(frames, detection_results)
+            if detections is not None
+        ]
+
+    def _failed_job(self, frame, error):
+        """Offline mode: a job without detections that still produces a record for its frame."""
+        self._seq += 1
+        job = FrameJob(self._seq, frame, None)
+        job.error = error
+        return job
+
+    def _gated_detections(self, frames):
+        """
+        Detection results for a batch of frames. Frames the motion gate lets through go to YOLO
+        in one batch; the others reuse the newest result of the same camera (from this batch
+        when an earlier frame of that camera ran, otherwise from a previous batch).
+        """
+        if not self.gate_enabled:
+            return self.yolo.execute_batch([frame.image for frame in frames],
+                                           keys=[frame.source_id for frame in frames])
+        
+        run_idx = []
+        reuse = {}          # frame index -> index of the run it reuses (None = previous batch)
+        latest_run = {}     # source_id -> newest index in this batch that runs YOLO
+        for i, frame in enumerate(frames):
+            source_id = frame.source_id
+            if source_id not in self.gates:
+                self.gates[source_id] = MotionGate.from_config(self.config)
+            has_previous = source_id in latest_run or source_id in self._last_detections
+            if not self.gates[source_id].needs_detection(frame.image) and has_previous:
+                reuse[i] = latest_run.get(source_id)
+            else:
+                run_idx.append(i)
+                latest_run[source_id] = i
+        
+        detection_results = [None] * len(frames)
+        if run_idx:
+            fresh = self.yolo.execute_batch([frames[i].image for i in run_idx],
+                                            keys=[frames[i].source_id for i in run_idx])
+            for i, result in zip(run_idx, fresh):
+                detection_results[i] = result
+                if result is not None:
+                    self._last_detections[frames[i].source_id] = result
+                else:
+                    # No result to reuse: make sure the next frame of this camera runs
+                    self.gates[frames[i].source_id].reset()
+        
+        for i, j in reuse.items():
+            previous = detection_results[j] if j is not None else self._last_detections.get(frames[i].source_id)
+            # Detections hold no pixels, so the same object is reused on the new frame as-is
+            detection_results[i] = previous
+        return detection_results
+
+    def _route_detections(self, frame, detections):
+        """Track the boxes of one camera's frame and route every crop to its secondary task."""
+        image = frame.image
+        
+        # Clip once for the whole frame; boxes without area are dropped here
+        detections = detections.clip(image.shape[1], image.shape[0])
+        self._seq += 1
+        job = FrameJob(self._seq, frame, detections)
+        if len(detections) == 0:
+            return job
+        
+        xyxy = detections.int_boxes()
+        labels = detections.labels()
+        if frame.source_id not in self.trackers:
+            # Sources that were not known up front (e.g. offline video files)
+            self.trackers[frame.source_id] = IoUTracker.from_config(self.config)
+        tracker = self.trackers[frame.source_id]
+        tracks = tracker.update(xyxy, labels) if tracker is not None else [None] * len(labels)
+        
+        for (x1, y1, x2, y2), label, track in zip(xyxy.tolist(), labels, tracks):
+            cropped_img = image[y1:y2, x1:x2]
+            if cropped_img.size == 0: 
+                continue
+            
+            if label == "analog-gauge":
+                job.analog_crops.append(cropped_img)
+                continue
+            
+            if label == "digital-gauge":
+                if self.ocr_task is None:
+                    continue
+                batch = job.ocr
+            else:
+                if self.cls_task is None:
+                    continue
+                batch = job.cls
+            
+            # Tracks that do not need a refresh reuse their last result. Offline, detection runs
+            # ahead of secondary inference, so a track whose first result is still in flight has
+            # nothing to reuse yet and runs again rather than leaving the record empty.
+            stale = track is None or tracker.needs_update(track, cropped_img)
+            if not stale and (track.result is not None or not self.offline):
+                batch.add(cropped_img, (x1, y1, x2, y2), track, result=track.result, needs_run=False)
+            else:
+                if track is not None:
+                    tracker.mark_dispatched(track)
+                batch.add(cropped_img, (x1, y1, x2, y2), track)
+        
+        return job
+
+    def _release_pending(self, job):
+        """
+        A job dropped before its secondary inference ran: its tracks were marked dispatched
+        on the detect thread, so clear that and let the next frame re-run them right away.
+        """
+        tracker = self.trackers.get(job.frame.source_id)
+        if tracker is None:
+            return
+        for batch in (job.ocr, job.cls):
+            for i in batch.pending:
+                if batch.tracks[i] is not None and batch.results[i] is None:
+                    tracker.set_result(batch.tracks[i], None)
+
+    def _infer_secondary(self, job):
+        """Stage 2: batched OCR and classification for one frame."""
+        if not self._check_deadline(job.frame, 'secondary'):
+            self._release_pending(job)
+            return None
+        source_id = job.frame.source_id
+        if job.frame.encoded is not None:
+            # Digits need every pixel: re-crop what actually runs OCR from the full-resolution JPEG
+            # (decoded here, off the detect thread, and not at all when every track reuses its result)
+            for i in job.ocr.pending:
+                job.ocr.crops[i] = job.frame.full_res_crop(job.ocr.boxes[i])
+        self._run_batch(self.ocr_task, self.ocr_cache, self._ocr_lock, job.ocr, source_id)
+        self._run_batch(self.cls_task, self.cls_cache, self._cls_lock, job.cls, source_id)
+        return job
+
+    def _publish(self, job):
+        """Stage 3: draw overlays and push every view to its output stream."""
+        with self._publish_lock:
+            # With several workers a slow frame may finish after a newer one; never go back in time
+            source_id = job.frame.source_id
+            if job.seq < self._last_published_seq.get(source_id, -1):
+                return None
+            self._last_published_seq[source_id] = job.seq
+        
+        frame = job.frame
+        if not self._check_deadline(frame, 'publish'):
+            return None
+        
+        out_cfg = self.config.get('output_stream', {})
+        annotated_frame = self.visualizer.draw_detections(
+            frame.image, job.detections, size=(out_cfg.get('width', 640), out_cfg.get('height', 480)))
+        self.push_to_stream('od', annotated_frame, frame)
+        
+        for cropped_img in job.analog_crops:
+            self.push_to_stream('analog', cropped_img, frame)
+        
+        for cropped_img, result in zip(job.ocr.crops, job.ocr.results):
+            if result is not None and result[0]:
+                self.push_to_stream('ocr', self._render_ocr(cropped_img, result[0]), frame)
+        
+        for cropped_img, result in zip(job.cls.crops, job.cls.results):
+            if result is not None and result[0]:
+                pred_class, conf = result
+                self.push_to_stream('classification', self._render_classification(cropped_img, pred_class, conf), frame)
+        
+        self.pipeline_latency.record(frame.age())
+        self._log_stats()
+        return None
+
+    def _start_workers(self):
+        secondary_queue = queue.Queue(maxsize=self.stage_queue_size)
+        publish_queue = queue.Queue(maxsize=self.stage_queue_size)
+        
+        for i in range(self.secondary_workers):
+            self.workers.append(StageWorker(f"SecondaryStage-{i}", self._infer_secondary, secondary_queue, publish_queue,
+                                            on_drop=self._release_pending))
+        for i in range(self.render_workers):
+            self.workers.append(StageWorker(f"PublishStage-{i}", self._publish, publish_queue))
+        
+        for worker in self.workers:
+            worker.start()
+        
+        self.logger.info(f"[TaskManager] Pipeline started: 1 detect, {self.secondary_workers} secondary, "
+                         f"{self.render_workers} publish worker(s), queue size {self.stage_queue_size}.")
+        return secondary_queue
 
     def run(self):
+        # Detection stays on this thread: it owns the YOLO predictor and the trackers, which need frames in order
+        secondary_queue = self._start_workers() if self.pipelined else None
+        
         while self.running:
             try:
-                frame = self.frame_queue.get(timeout=1.0)
+                frames = self._gather_frames(timeout=1.0)
                 
-                detection_result = self.yolo.execute(frame)
-                
-                if detection_result is None:
-                    continue
-                
-                annotated_frame = detection_result.plot()
-                self.push_to_stream('od', annotated_frame)
-                
-                boxes = detection_result.boxes
-                if boxes is not None and len(boxes) > 0:
-                    for box in boxes:
-                        cls_id = int(box.cls[0].item())
-                        label = detection_result.names[cls_id] 
-                        
-                        x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
-                        cropped_img = frame[y1:y2, x1:x2]
-                        if cropped_img.size == 0: 
-                            continue
-                        
-                        if label == "digital-gauge": 
-                            text, conf = self.ocr_task.execute(cropped_img)
-                            if text:
-                                ocr_display = cropped_img.copy()
-                                
-                               
-                                display_text = text
-                                ocr_display = self.visualizer.draw_unicode_text(
-                                    ocr_display, 
-                                    display_text, 
-                                    position=(5, 5),     
-                                    font_size=25,        
-                                    color=(0, 0, 255)    
-                                )
-                                
-                                self.push_to_stream('ocr', ocr_display)
-                                
-                        elif label == "analog-gauge":
-                            self.push_to_stream('analog', cropped_img)
-                        else:
-                            pred_class, conf = self.cls_task.execute(cropped_img)
-                            
-                            if pred_class:
-                                
-                                canvas_w, canvas_h = 640, 480
-                                cls_display = np.zeros((canvas_h, canvas_w, 3), dtype=np.uint8)
-                                
-                               
-                                h, w = cropped_img.shape[:2]
-                                scale = min((canvas_w - 40) / w, (canvas_h - 100) / h)
-                                new_w, new_h = int(w * scale), int(h * scale)
-                                resized_crop = cv2.resize(cropped_img, (new_w, new_h))
-                                
-                              
-                                x_offset = (canvas_w - new_w) // 2
-                                y_offset = (canvas_h + 50 - new_h) // 2 
-                                
-                               
-                                cls_display[y_offset:y_offset+new_h, x_offset:x_offset+new_w] = resized_crop
-                                
-                               
-                                display_text = f"CLASS: {pred_class.upper()} ({conf:.1f}%)"
-                                text_color = (0, 255, 0) if pred_class == "normal" else (0, 0, 255)
-                                
-                                cls_display = self.visualizer.draw_unicode_text(
-                                    cls_display, 
-                                    display_text, 
-                                    position=(20, 20),  
-                                    font_size=36,
-                                    color=text_color
-                                )
-                                
-                               
-                                # cv2.imwrite('debug_cls_stream.jpg', cls_display)
-                                
-                                
-                                self.push_to_stream('classification', cls_display)
+                for job in self._detect(frames):
+                    if secondary_queue is not None:
+                        if not put_blocking(secondary_queue, job, lambda: self.running):
+                            self._release_pending(job)
+                    else:
+                        try:
+                            job = self._infer_secondary(job)
+                        except Exception:
+                            self._release_pending(job)
+                            raise
+                        if job is not None:
+                            self._publish(job)
                             
             except queue.Empty:
                 continue
             except Exception as e:
                 self.logger.error(f"[TaskManager] Critical error in AI loop: {e}")
                 self.logger.debug(traceback.format_exc())
+        
+        for worker in self.workers:
+            worker.stop()
+        for worker in self.workers:
+            worker.join()
+
+    def run_offline(self, frame_queue, on_result):
+        """
+        Offline mode: drain a blocking queue of Frames (None = end of input) as fast as possible.
+        No deadlines and no drops; detection of batch N+1 overlaps secondary inference of batch N,
+        and every finished FrameJob goes to on_result(job) in order. Runs on the caller's thread.
+        """
+        self.max_age = {}
+        self.offline = True
+        # The result cache expires on wall-clock time; at offline speed one reading would cover minutes of footage
+        self.ocr_cache = None
+        self.cls_cache = None
+        # Nothing is served while loading, so every frame waits for the models instead
+        self.wait_ready()
+        if self.yolo is None:
+            self.logger.error("[TaskManager] Object detection is not available. Nothing to do offline.")
+            return 0
+        jobs = queue.Queue(maxsize=self.stage_queue_size)
+        started = time.monotonic()
+        processed = 0
+        
+        def secondary_loop():
+            while True:
+                job = jobs.get()
+                if job is None:
+                    return
+                try:
+                    result = self._infer_secondary(job)
+                except Exception as e:
+                    self.logger.error(f"[TaskManager] Offline secondary stage error: {e}")
+                    self.logger.debug(traceback.format_exc())
+                    # Still write the frame, with whatever results it has
+                    job.error = f"secondary inference failed: {e}"
+                    result = job
+                try:
+                    on_result(result)
+                except Exception as e:
+                    self.logger.error(f"[TaskManager] Offline result error: {e}")
+                    self.logger.debug(traceback.format_exc())
+        
+        worker = threading.Thread(target=secondary_loop, name="OfflineSecondary", daemon=True)
+        worker.start()
+        
+        end_of_input = False
+        while self.running and not end_of_input:
+            frame = frame_queue.get()
+            if frame is None:
+                break
+            
+            # Fill the batch with whatever is already decoded, without waiting for more
+            frames = [frame]
+            while len(frames) < self.offline_batch_size:
+                try:
+                    frame = frame_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if frame is None:
+                    end_of_input = True
+                    break
+                frames.append(frame)
+            
+            try:
+                detected = self._detect(frames)
+            except Exception as e:
+                self.logger.error(f"[TaskManager] Offline detection error: {e}")
+                self.logger.debug(traceback.format_exc())
+                detected = [self._failed_job(frame, f"detection failed: {e}") for frame in frames]
+            for job in detected:
+                put_blocking(jobs, job, lambda: self.running)
+            processed += len(frames)
+            
+            if time.monotonic() - self._last_stats >= self.stats_interval:
+                elapsed = time.monotonic() - started
+                self.logger.info(f"[TaskManager] Offline: {processed} frames in {elapsed:.0f}s "
+                                 f"({processed / max(elapsed, 1e-6):.1f} FPS)")
+            self._log_stats()
+        
+        jobs.put(None)
+        worker.join()
+        elapsed = time.monotonic() - started
+        self.logger.info(f"[TaskManager] Offline run finished: {processed} frames in {elapsed:.1f}s "
+                         f"({processed / max(elapsed, 1e-6):.1f} FPS)")
+        return processed
 
     def stop(self):
-        self.running = False
\ No newline at end of file
+        with self._tasks_lock:
+            self.running = False
+            ocr_task, cls_task = self.ocr_task, self.cls_task
+        # Loads that have not started are cancelled; one in progress stops its own task when it finishes
+        for future in self._load_futures:
+            future.cancel()
+        if cls_task is not None:
+            cls_task.stop()
+        if isinstance(ocr_task, ProcessPoolTask):
+            ocr_task.stop()
\ No newline at end of file
@@ -0,0 +1,179 @@
+import cv2
+import numpy as np
+import torch
+from torchvision.ops import batched_nms
+
+
+def tile_starts(length: int, tile: int, overlap: float):
+    """Start offsets of overlapping tiles covering [0, length); the last tile is flush with the edge."""
+    if length <= tile:
+        return [0]
+    step = max(1, int(tile * (1.0 - overlap)))
+    starts = list(range(0, length - tile, step))
+    starts.append(length - tile)
+    return starts
+
+
+class _TileState:
+    """What one tile of one camera looked like (and yielded) the last time it was inferred."""
+    __slots__ = ('thumb', 'detections', 'age')
+
+    def __init__(self, thumb, detections):
+        self.thumb = thumb
+        self.detections = detections
+        self.age = 0
+
+
+class TiledDetector:
+    """
+    Sliced inference for small objects on high-resolution frames: every frame is cut into
+    overlapping `tile_size` tiles (or configured ROIs, plus optionally the whole frame), all
+    tiles of all frames go through the detector as one batch, and boxes are shifted back to
+    frame coordinates and merged with class-wise NMS.
+
+    Tiles whose pixels did not change since they were last inferred reuse that result,
+    until `refresh_interval` frames have passed. State is kept per source key.
+    """
+    def __init__(self, predict_fn, tile_size: int = 640, overlap: float = 0.2, rois=None,
+                 full_frame: bool = True, nms_iou: float = 0.5, change_threshold: float = 3.0,
+                 refresh_interval: int = 15, thumb_width: int = 320):
+        self.predict_fn = predict_fn        # list of images -> list of (N, 6) arrays [x1, y1, x2, y2, conf, cls]
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.rois = rois or {}
+        self.full_frame = full_frame
+        self.nms_iou = nms_iou
+        self.change_threshold = change_threshold
+        self.refresh_interval = refresh_interval
+        self.thumb_width = thumb_width
+
+        self._layouts = {}
+        self._states = {}
+
+        self.tiles_run = 0
+        self.tiles_reused = 0
+
+    @classmethod
+    def from_config(cls, config: dict, predict_fn):
+        """config is the object_detection section; returns None unless tiling.enabled."""
+        tiling_cfg = config.get('tiling', {})
+        if not tiling_cfg.get('enabled', False):
+            return None
+        return cls(
+            predict_fn,
+            tile_size=int(tiling_cfg.get('tile_size', config.get('img_size', 640))),
+            overlap=float(tiling_cfg.get('overlap', 0.2)),
+            rois=tiling_cfg.get('rois') or {},
+            full_frame=tiling_cfg.get('full_frame', True),
+            nms_iou=float(tiling_cfg.get('nms_iou', 0.5)),
+            change_threshold=float(tiling_cfg.get('change_threshold', 3.0)),
+            refresh_interval=int(tiling_cfg.get('refresh_interval', 15)),
+        )
+
+    # ------------------------------------------------------------------
+    # Layout
+    # ------------------------------------------------------------------
+    def _rois_for(self, key):
+        if isinstance(self.rois, dict):
+            return self.rois.get(key) or self.rois.get('default')
+        return self.rois
+
+    def layout(self, shape, key='default'):
+        """Tile rectangles (x1, y1, x2, y2) for a frame of this shape."""
+        h, w = shape[:2]
+        cache_key = (key, h, w)
+        if cache_key in self._layouts:
+            return self._layouts[cache_key]
+
+        rois = self._rois_for(key)
+        if rois:
+            tiles = []
+            for x1, y1, x2, y2 in rois:
+                x1, x2 = sorted((int(np.clip(x1, 0, w)), int(np.clip(x2, 0, w))))
+                y1, y2 = sorted((int(np.clip(y1, 0, h)), int(np.clip(y2, 0, h))))
+                if x2 > x1 and y2 > y1:
+                    tiles.append((x1, y1, x2, y2))
+        else:
+            tiles = [
+                (x, y, min(x + self.tile_size, w), min(y + self.tile_size, h))
+                for y in tile_starts(h, self.tile_size, self.overlap)
+                for x in tile_starts(w, self.tile_size, self.overlap)
+            ]
+
+        # The whole frame catches objects larger than a tile; skip it when one tile already is the frame
+        if self.full_frame and (0, 0, w, h) not in tiles:
+            tiles.append((0, 0, w, h))
+
+        self._layouts[cache_key] = tiles
+        return tiles
+
+    # ------------------------------------------------------------------
+    # Inference
+    # ------------------------------------------------------------------
+    def _thumbnail(self, image):
+        h, w = image.shape[:2]
+        scale = min(1.0, self.thumb_width / w)
+        small = cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return gray, scale
+
+    def detect(self, frames, keys=None):
+        """One (N, 6) array [x1, y1, x2, y2, conf, cls] in frame coordinates per frame."""
+        keys = keys or ['default'] * len(frames)
+
+        jobs = []       # (frame index, tile, tile thumbnail)
+        reused = [[] for _ in frames]
+        for i, (image, key) in enumerate(zip(frames, keys)):
+            tiles = self.layout(image.shape, key)
+            states = self._states.get(key)
+            if states is None or states.get('shape') != image.shape[:2]:
+                states = self._states[key] = {'shape': image.shape[:2]}
+
+            gray, scale = self._thumbnail(image)
+            for tile in tiles:
+                x1, y1, x2, y2 = tile
+                thumb = gray[int(y1 * scale):max(int(y2 * scale), int(y1 * scale) + 1),
+                             int(x1 * scale):max(int(x2 * scale), int(x1 * scale) + 1)]
+                state = states.get(tile)
+                if (state is not None and state.age < self.refresh_interval
+                        and float(cv2.absdiff(thumb, state.thumb).mean()) < self.change_threshold):
+                    state.age += 1
+                    self.tiles_reused += 1
+                    reused[i].append(state.detections)
+                else:
+                    jobs.append((i, tile, thumb))
+
+        tile_images = [frames[i][y1:y2, x1:x2] for i, (x1, y1, x2, y2), _ in jobs]
+        predictions = self.predict_fn(tile_images) if tile_images else []
+        self.tiles_run += len(jobs)
+
+        fresh = [[] for _ in frames]
+        for (i, tile, thumb), data in zip(jobs, predictions):
+            data = np.zeros((0, 6), dtype=np.float32) if data is None else data.astype(np.float32, copy=True)
+            data[:, [0, 2]] += tile[0]
+            data[:, [1, 3]] += tile[1]
+            self._states[keys[i]][tile] = _TileState(thumb.copy(), data)
+            fresh[i].append(data)
+
+        return [self._merge(fresh[i] + reused[i]) for i in range(len(frames))]
+
+    def _merge(self, parts):
+        """Class-wise NMS over the detections of all tiles of one frame."""
+        parts = [p for p in parts if len(p)]
+        if not parts:
+            return np.zeros((0, 6), dtype=np.float32)
+        data = np.concatenate(parts)
+        if len(parts) == 1:
+            return data
+
+        tensor = torch.from_numpy(data)
+        keep = batched_nms(tensor[:, :4], tensor[:, 4], tensor[:, 5].long(), self.nms_iou)
+        return data[keep.numpy()]
+
+    def stats(self):
+        total = self.tiles_run + self.tiles_reused
+        return {
+            'tiles_run': self.tiles_run,
+            'tiles_reused': self.tiles_reused,
+            'reuse_rate': self.tiles_reused / total if total else 0.0,
+        }
@@ -0,0 +1,150 @@
+import numpy as np
+
+from tasks.result_cache import crop_signature
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray):
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy arrays."""
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+
+    a = boxes_a[:, None, :].astype(np.float32)
+    b = boxes_b[None, :, :].astype(np.float32)
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-6)
+
+
+class Track:
+    __slots__ = ('track_id', 'label', 'box', 'missed', 'last_run_frame', 'last_run_box', 'result',
+                 'signature', 'last_run_signature')
+
+    def __init__(self, track_id: int, label: str, box: np.ndarray):
+        self.track_id = track_id
+        self.label = label
+        self.box = box
+        self.missed = 0
+        self.last_run_frame = None
+        self.last_run_box = None
+        self.result = None
+        self.signature = None            # crop signature of the current frame (set by needs_update)
+        self.last_run_signature = None
+
+
+class IoUTracker:
+    """
+    Greedy IoU multi-object tracker (CPU) for fixed cameras.
+    Gives detections stable track IDs so secondary tasks run per track instead of per frame.
+    """
+    def __init__(self, iou_threshold: float = 0.3, max_missed: int = 10,
+                 refresh_interval: int = 30, move_iou: float = 0.85, change_threshold: float = 12.0):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.refresh_interval = refresh_interval
+        self.move_iou = move_iou
+        self.change_threshold = change_threshold
+
+        self.tracks = []
+        self.frame_index = 0
+        self._next_id = 1
+
+    @classmethod
+    def from_config(cls, config: dict):
+        track_cfg = config.get('tracking', {})
+        if not track_cfg.get('enabled', False):
+            return None
+        return cls(
+            iou_threshold=track_cfg.get('iou_threshold', 0.3),
+            max_missed=track_cfg.get('max_missed', 10),
+            refresh_interval=track_cfg.get('refresh_interval', 30),
+            move_iou=track_cfg.get('move_iou', 0.85),
+            change_threshold=track_cfg.get('change_threshold', 12.0),
+        )
+
+    def update(self, boxes: np.ndarray, labels: list):
+        """Match this frame's detections to tracks. Returns one Track per input box."""
+        self.frame_index += 1
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        assigned = [None] * len(boxes)
+
+        if self.tracks and len(boxes):
+            track_boxes = np.stack([t.box for t in self.tracks])
+            ious = iou_matrix(track_boxes, boxes)
+
+            # A track may only continue with a detection of the same label
+            track_labels = np.array([t.label for t in self.tracks], dtype=object)
+            ious[track_labels[:, None] != np.array(labels, dtype=object)[None, :]] = 0.0
+
+            # Greedy matching, highest IoU first
+            order = np.argsort(-ious, axis=None)
+            used_tracks, used_dets = set(), set()
+            for flat in order:
+                t_idx, d_idx = divmod(int(flat), len(boxes))
+                if ious[t_idx, d_idx] < self.iou_threshold:
+                    break
+                if t_idx in used_tracks or d_idx in used_dets:
+                    continue
+                used_tracks.add(t_idx)
+                used_dets.add(d_idx)
+                track = self.tracks[t_idx]
+                track.box = boxes[d_idx]
+                track.missed = 0
+                assigned[d_idx] = track
+
+        matched = {id(t) for t in assigned if t is not None}
+        survivors = []
+        for track in self.tracks:
+            if id(track) not in matched:
+                track.missed += 1
+                if track.missed > self.max_missed:
+                    continue
+            survivors.append(track)
+
+        for d_idx, track in enumerate(assigned):
+            if track is None:
+                track = Track(self._next_id, labels[d_idx], boxes[d_idx])
+                self._next_id += 1
+                survivors.append(track)
+                assigned[d_idx] = track
+
+        self.tracks = survivors
+        return assigned
+
+    def needs_update(self, track: Track, crop=None):
+        """
+        New tracks, stale tracks, tracks whose box moved/resized and (given the crop) tracks whose
+        content changed, e.g. a gauge showing new digits in a box that did not move, must be re-inferred.
+        """
+        track.signature = None
+        if crop is not None and self.change_threshold > 0:
+            track.signature = crop_signature(crop)
+
+        if track.last_run_frame is None:
+            return True
+        if self.frame_index - track.last_run_frame >= self.refresh_interval:
+            return True
+        moved_iou = iou_matrix(track.box[None, :], track.last_run_box[None, :])[0, 0]
+        if moved_iou < self.move_iou:
+            return True
+        if track.signature is not None and track.last_run_signature is not None:
+            return float(np.max(np.abs(track.signature - track.last_run_signature))) > self.change_threshold
+        return False
+
+    def mark_dispatched(self, track: Track):
+        """
+        Record that inference was started for this track. Done when the crop is dispatched
+        (not when the result comes back) so a pipelined consumer does not dispatch it twice.
+        """
+        track.last_run_frame = self.frame_index
+        track.last_run_box = track.box.copy()
+        track.last_run_signature = track.signature
+
+    def set_result(self, track: Track, result):
+        if result is None or not result[0]:
+            # Failed readings are not remembered so the next frame retries them
+            track.last_run_frame = None
+            return
+        track.result = result
@@ -0,0 +1,109 @@
+"""
+Compare YOLO inference backends on sample frames.
+
+    python test/benchmark_backends.py --weights models/obj_model/best.pt --images test/media_folder \
+        --backends native onnx openvino --batch 1 4
+
+Every backend goes through tasks.model_export.load_yolo (export + cache + warm-up), exactly like
+the pipeline, then reports per-call latency, throughput and how closely its detections match
+the first backend listed.
+"""
+import os
+import sys
+import time
+import argparse
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tasks.detections import Detections
+from tasks.model_export import load_yolo
+from tasks.tracker import iou_matrix
+
+VALID_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def load_frames(folder, limit):
+    names = sorted(f for f in os.listdir(folder) if f.lower().endswith(VALID_EXTENSIONS))[:limit]
+    frames = [cv2.imread(os.path.join(folder, name)) for name in names]
+    return [frame for frame in frames if frame is not None]
+
+
+def agreement(reference, detections, iou=0.5):
+    """Fraction of reference boxes matched (same class, IoU >= iou) by the other backend."""
+    total = matched = 0
+    for ref, det in zip(reference, detections):
+        total += len(ref)
+        if len(ref) == 0 or len(det) == 0:
+            continue
+        ious = iou_matrix(ref.xyxy, det.xyxy)
+        ious[ref.cls[:, None] != det.cls[None, :]] = 0
+        matched += int((ious.max(axis=1) >= iou).sum())
+    return matched / total if total else 1.0
+
+
+def benchmark(model, frames, img_size, conf, batch, runs):
+    latencies = []
+    detections = []
+    for run in range(runs):
+        for start in range(0, len(frames), batch):
+            chunk = frames[start:start + batch]
+            t0 = time.perf_counter()
+            results = model.predict(source=chunk if batch > 1 else chunk[0], imgsz=img_size, conf=conf, verbose=False)
+            latencies.append(time.perf_counter() - t0)
+            if run == 0:
+                detections.extend(Detections.from_result(r) for r in results)
+    latencies = np.array(latencies)
+    return {
+        'p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'p95_ms': float(np.percentile(latencies, 95) * 1000),
+        'fps': len(frames) * runs / float(latencies.sum()),
+    }, detections
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark YOLO backends on sample frames")
+    parser.add_argument('--weights', required=True, help="PyTorch weights (.pt); exports are made from it")
+    parser.add_argument('--images', required=True, help="Folder of sample frames")
+    parser.add_argument('--backends', nargs='+', default=['native', 'onnx', 'openvino'])
+    parser.add_argument('--img-size', type=int, default=640)
+    parser.add_argument('--conf', type=float, default=0.5)
+    parser.add_argument('--batch', type=int, nargs='+', default=[1])
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--limit', type=int, default=50, help="Max number of sample frames")
+    parser.add_argument('--cache-dir', default='cache/models')
+    args = parser.parse_args()
+
+    frames = load_frames(args.images, args.limit)
+    if not frames:
+        print(f"No images found in {args.images}")
+        sys.exit(1)
+    print(f"{len(frames)} frames, img_size {args.img_size}, {args.runs} runs\n")
+
+    rows = []
+    reference = None
+    for backend in args.backends:
+        try:
+            t0 = time.perf_counter()
+            model, resolved = load_yolo(args.weights, backend=backend, img_size=args.img_size,
+                                        cache_dir=args.cache_dir, warmup=True, batch_size=max(args.batch))
+            load_s = time.perf_counter() - t0
+        except Exception as e:
+            print(f"[{backend}] unavailable: {e}")
+            continue
+
+        for batch in args.batch:
+            stats, detections = benchmark(model, frames, args.img_size, args.conf, batch, args.runs)
+            if reference is None:
+                reference = detections
+            rows.append((resolved, batch, load_s, stats, agreement(reference, detections)))
+
+    print(f"{'backend':<10} {'batch':>5} {'load+warmup':>12} {'p50 ms':>8} {'p95 ms':>8} {'FPS':>8} {'match':>7}")
+    for backend, batch, load_s, stats, match in rows:
+        print(f"{backend:<10} {batch:>5} {load_s:>11.1f}s {stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} "
+              f"{stats['fps']:>8.1f} {match:>7.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Frame splitting of MJPEGRECEIVEProducer, fed with multipart streams cut into arbitrary chunks.
+
+    python -m pytest test/test_mjpeg_parser.py
+"""
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("requests")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stream.latest_slot import LatestFrameSlot
+from stream.mjpeg_rev import MJPEGRECEIVEProducer
+
+
+def fake_jpeg(i, thumbnail=False):
+    """SOI ... EOI with an optional embedded EXIF-style thumbnail (its own SOI/EOI pair)."""
+    body = b'\xff\xd8' + b'\xff\xe1' + bytes([i]) * 8
+    if thumbnail:
+        body += b'\xff\xd8' + b'thumbnail' + b'\xff\xd9'
+    return body + bytes([i]) * 32 + b'\xff\xd9'
+
+
+def multipart(frames, boundary=b'frame', content_length=True):
+    stream = b''
+    for frame in frames:
+        stream += b'--' + boundary + b'\r\nContent-Type: image/jpeg\r\n'
+        if content_length:
+            stream += b'Content-Length: %d\r\n' % len(frame)
+        stream += b'\r\n' + frame + b'\r\n'
+    return stream + b'--' + boundary + b'\r\n'
+
+
+def make_producer(content_type):
+    producer = MJPEGRECEIVEProducer('http://camera/stream.mjpeg', LatestFrameSlot(), config={})
+    producer.delimiter = producer._boundary(content_type)
+    return producer
+
+
+def split_frames(producer, stream, chunk_size):
+    """Feed the stream chunk by chunk; returns every frame the parser reported as newest."""
+    seen = []
+    for start in range(0, len(stream), chunk_size):
+        producer.buffer += stream[start:start + chunk_size]
+        latest, found = producer._find_frames()
+        if latest is not None:
+            seen.append(bytes(producer.buffer[latest[0]:latest[1]]))
+        producer._compact()
+    return seen
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 7, 64, 4096])
+@pytest.mark.parametrize('content_length', [True, False])
+@pytest.mark.parametrize('thumbnail', [True, False])
+def test_multipart_frames_are_split_whole(chunk_size, content_length, thumbnail):
+    frames = [fake_jpeg(i, thumbnail) for i in range(1, 6)]
+    producer = make_producer('multipart/x-mixed-replace; boundary=frame')
+
+    seen = split_frames(producer, multipart(frames, content_length=content_length), chunk_size)
+
+    assert seen, "no frame found"
+    assert all(frame in frames for frame in seen)
+    assert seen[-1] == frames[-1]
+    if chunk_size == 1:
+        assert seen == frames
+
+
+def test_boundary_with_leading_dashes():
+    producer = make_producer('multipart/x-mixed-replace;boundary="--myboundary"')
+    assert producer.delimiter == b'--myboundary'
+
+    frames = [fake_jpeg(i, thumbnail=True) for i in range(1, 4)]
+    # The camera writes the declared boundary as-is ("--myboundary"), not "----myboundary"
+    stream = multipart(frames, boundary=b'myboundary')
+    assert split_frames(producer, stream, 5)[-1] == frames[-1]
+
+
+def test_marker_fallback_without_boundary():
+    producer = make_producer('image/jpeg')
+    assert producer.delimiter is None
+
+    frames = [fake_jpeg(i) for i in range(1, 4)]
+    assert split_frames(producer, b''.join(frames), 7)[-1] == frames[-1]